@@ -0,0 +1,218 @@
+import json
+import os
+import re
+import shutil
+import threading
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+BAR_STORE_DIR = "data/bars"
+BAR_STORE_MAX_BYTES = 256 * 1024 * 1024
+BAR_STORE_MAX_BARS = 60_000
+# Rewrite a series once appended batches make it this much larger than its live bars.
+BAR_STORE_COMPACT_RATIO = 2
+BAR_FIELDS = ("date", "open", "high", "low", "close", "volume")
+# One fixed-width little-endian array file per column: int64 epochs, float64 OHLCV (NaN = missing).
+BAR_COLUMN_DTYPES = {field: np.dtype("<i8" if field == "date" else "<f8") for field in BAR_FIELDS}
+BAR_COLUMN_SUFFIX = ".col"
+META_FILE_NAME = "meta.json"
+SYMBOL_FILE_RE = re.compile(r"[^A-Za-z0-9=._-]")
+
+BarColumns = dict[str, np.ndarray]
+
+
+# Each series is a directory of column files, all append-only: every write is an ascending batch
+# of bars that supersedes all stored bars from its first epoch on, so tail refreshes and Yahoo's
+# live quote row never need an in-place edit. Reads memory-map the columns and replay the batches
+# on the mapped epochs. The chart meta of the latest write sits next to them in meta.json.
+class BarStore:
+    def __init__(self, root: str | Path, max_bytes: int = BAR_STORE_MAX_BYTES, max_bars: int = BAR_STORE_MAX_BARS) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_bars = max_bars
+        self.reads = 0
+        self.appended_bars = 0
+        self._last_epochs: dict[Path, int | None] = {}
+        self._locks: dict[Path, threading.Lock] = {}
+
+    def path(self, symbol: str, interval: str, window: str, prepost: str) -> Path:
+        # The range is part of the name: 60m bars over 1mo and 3mo are separate series.
+        return self.root / f"{SYMBOL_FILE_RE.sub('_', symbol)}@{interval}@{window}@{prepost}"
+
+    def read(self, symbol: str, interval: str, window: str, prepost: str) -> BarColumns | None:
+        path = self.path(symbol, interval, window, prepost)
+        with self._lock(path):
+            columns = _read_columns(path)
+            if columns is not None:
+                self.reads += 1
+                self._last_epochs[path] = int(columns["date"][-1])
+        return columns
+
+    def read_meta(self, symbol: str, interval: str, window: str, prepost: str) -> dict[str, Any]:
+        try:
+            meta = json.loads((self.path(symbol, interval, window, prepost) / META_FILE_NAME).read_bytes())
+        except (FileNotFoundError, NotADirectoryError, ValueError):
+            return {}
+        return meta if isinstance(meta, dict) else {}
+
+    def append(
+        self,
+        symbol: str,
+        interval: str,
+        window: str,
+        prepost: str,
+        columns: dict[str, Sequence[Any]],
+        meta: dict[str, Any] | None = None,
+    ) -> None:
+        if not len(columns["date"]):
+            return
+        path = self.path(symbol, interval, window, prepost)
+        # Appends run in worker threads; two refreshes of one series must not interleave.
+        with self._lock(path):
+            self._append(path, _to_arrays(columns), meta)
+
+    def _lock(self, path: Path) -> threading.Lock:
+        return self._locks.setdefault(path, threading.Lock())
+
+    def _append(self, path: Path, columns: BarColumns, meta: dict[str, Any] | None) -> None:
+        dates = columns["date"]
+        stored_bars = _align_columns(path)
+        if path not in self._last_epochs:
+            stored = _read_columns(path)
+            self._last_epochs[path] = int(stored["date"][-1]) if stored is not None else None
+        last_epoch = self._last_epochs[path]
+        # Only rewrite from the bar before the stored last one; older bars are already on disk.
+        start = 0 if last_epoch is None else max(0, int(np.searchsorted(dates, last_epoch)) - 1)
+        path.mkdir(parents=True, exist_ok=True)
+        for field in BAR_FIELDS:
+            with open(_column_path(path, field), "ab") as file:
+                file.write(columns[field][start:].tobytes())
+        self._last_epochs[path] = int(dates[-1])
+        self.appended_bars += len(dates) - start
+        if meta is not None:
+            temp = path / (META_FILE_NAME + ".tmp")
+            temp.write_text(json.dumps(meta))
+            os.replace(temp, path / META_FILE_NAME)
+        stored_bars += len(dates) - start
+        if last_epoch is None or stored_bars > BAR_STORE_COMPACT_RATIO * min(len(dates), self.max_bars):
+            if last_epoch is not None:
+                self.compact(path)
+            self.enforce_size_cap()
+
+    def compact(self, path: Path) -> None:
+        columns = _read_columns(path)
+        if columns is None:
+            return
+        first = max(0, len(columns["date"]) - self.max_bars)
+        # Rewrite every column into a fresh directory and swap it in; a crash mid-swap only loses
+        # the series, never pairs one column's bars with another's.
+        temp = path.with_name(path.name + ".tmp")
+        shutil.rmtree(temp, ignore_errors=True)
+        temp.mkdir(parents=True)
+        for field in BAR_FIELDS:
+            _column_path(temp, field).write_bytes(columns[field][first:].tobytes())
+        if (path / META_FILE_NAME).exists():
+            shutil.copyfile(path / META_FILE_NAME, temp / META_FILE_NAME)
+        old = path.with_name(path.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(path, old)
+        os.replace(temp, path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def enforce_size_cap(self) -> None:
+        series = sorted(
+            (path for path in self.root.glob("*@*@*@*") if path.is_dir() and path.suffix not in {".tmp", ".old"}),
+            key=lambda path: _column_path(path, "date").stat().st_mtime if _column_path(path, "date").exists() else 0.0,
+        )
+        sizes = {path: sum(file.stat().st_size for file in path.iterdir()) for path in series}
+        total = sum(sizes.values())
+        for path in series:
+            if total <= self.max_bytes:
+                break
+            total -= sizes[path]
+            shutil.rmtree(path, ignore_errors=True)
+            self._last_epochs.pop(path, None)
+
+
+def _column_path(path: Path, field: str) -> Path:
+    return path / f"{field}{BAR_COLUMN_SUFFIX}"
+
+
+def _to_arrays(columns: dict[str, Sequence[Any]]) -> BarColumns:
+    arrays = {"date": np.asarray(columns["date"], dtype=np.int64)}
+    for field in BAR_FIELDS[1:]:
+        try:
+            values = np.array(columns[field], dtype=np.float64)
+        except (TypeError, ValueError):
+            values = np.array([_float_or_nan(value) for value in columns[field]], dtype=np.float64)
+        values[~np.isfinite(values)] = np.nan
+        arrays[field] = values
+    return arrays
+
+
+def _float_or_nan(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _column_lengths(path: Path) -> list[int]:
+    lengths = []
+    for field in BAR_FIELDS:
+        try:
+            size = _column_path(path, field).stat().st_size
+        except (FileNotFoundError, NotADirectoryError):
+            size = 0
+        lengths.append(size // BAR_COLUMN_DTYPES[field].itemsize)
+    return lengths
+
+
+def _align_columns(path: Path) -> int:
+    # A write cut short (crash, full disk) can leave some columns a batch longer than others; cut
+    # them back to the shortest so the next batch lands on the same row in every column.
+    lengths = _column_lengths(path)
+    rows = min(lengths)
+    if max(lengths) != rows:
+        for field in BAR_FIELDS:
+            os.truncate(_column_path(path, field), rows * BAR_COLUMN_DTYPES[field].itemsize)
+    return rows
+
+
+def _read_columns(path: Path) -> BarColumns | None:
+    rows = min(_column_lengths(path))
+    if rows == 0:
+        return None
+    mapped = {
+        field: np.memmap(_column_path(path, field), dtype=BAR_COLUMN_DTYPES[field], mode="r", shape=(rows,))
+        for field in BAR_FIELDS
+    }
+    # Replay the batches: a bar is live unless a later bar (the start of a newer batch) is at or
+    # before it, i.e. its epoch is below the minimum of every epoch after it.
+    dates = mapped["date"]
+    later_min = np.minimum.accumulate(dates[::-1])[::-1]
+    live = np.append(dates[:-1] < later_min[1:], True)
+    # Boolean indexing copies just the live bars out of the mapping.
+    return {field: np.asarray(column[live]) for field, column in mapped.items()}
+
+
+def bar_store_from_env() -> BarStore:
+    return BarStore(os.getenv("BAR_STORE_DIR") or BAR_STORE_DIR)
+
+
+def stored_chart_data(columns: BarColumns | None, start: float, meta: dict[str, Any] | None = None) -> dict[str, Any] | None:
+    # Stored bars stand in for a full download only when they reach into the window's first session
+    # (`start`, a session boundary) and the tail left to fetch stays inside the window.
+    if columns is None or not len(columns["date"]):
+        return None
+    dates = columns["date"]
+    if dates[0] >= start + 86400 or dates[-1] < start:
+        return None
+    # The file keeps up to max_bars; the chart only gets the bars inside its own window.
+    first = int(np.searchsorted(dates, start))
+    quote = {field: columns[field][first:].tolist() for field in BAR_FIELDS[1:]}
+    result = {"meta": dict(meta or {}), "timestamp": dates[first:].tolist(), "indicators": {"quote": [quote]}}
+    return {"chart": {"result": [result], "error": None}}
@@ -0,0 +1,558 @@
+import asyncio
+import io
+from json import JSONDecodeError
+import multiprocessing
+import os
+import time
+from collections.abc import Awaitable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+from charting import (
+    CHART_IMAGE_ENCODINGS,
+    CHART_RASTERS,
+    PREFIX,
+    ChartRequest,
+    NoChartData,
+    _has_close_only_latest_ohlc,
+    _patch_close_only_latest_ohlc,
+    _safe_float,
+    _latest_quote_price_time,
+    aggregate_yahoo_chart_data,
+    _stock_previous_close,
+    chart_title,
+    parse_chart_command,
+    quote_description,
+    yahoo_chart_symbol,
+    yahoo_chart_url,
+)
+
+from bar_store import BarStore, bar_store_from_env, stored_chart_data
+from market_cache import (
+    CHART_CACHE_MAX_ENTRIES,
+    CHART_PAYLOAD_MAX_BYTES,
+    CHART_IMAGE_CACHE_MAX_BYTES,
+    ByteLRUCache,
+    DailyBarStore,
+    IntradaySeriesStore,
+    SingleFlight,
+    TTLCache,
+    chart_bar_columns,
+    chart_cache_key,
+    chart_cache_ttl,
+    chart_image_key,
+    chart_interval_seconds,
+    chart_tail_url,
+    chart_window_start,
+    daily_session_closes,
+    decode_chart_json,
+    derive_cached_chart,
+    merge_chart_tail,
+    previous_session_close,
+)
+from render_worker import render_chart_image, warm_chart_renderer
+
+import aiohttp
+import discord
+from dotenv import load_dotenv
+
+
+class MarketDataProviderError(RuntimeError):
+    pass
+
+HELP_TEXT = """**ChartVF**
+
+**Syntax**
+`;TICKER [timeframe] [type] [range] [theme] [scale]` — stocks
+`;fut ROOT [timeframe] [type] [range] [theme] [scale]` — futures
+
+**Examples**
+`;AAPL` → latest 5-minute candle chart
+`;AAPL d` → daily candle chart
+`;AMD 3` → AMD 3-minute intraday chart
+`;QQQ w line` → weekly line chart
+`;LULU 1y` → 1-year chart
+`;AAPL dark log` → dark theme, log scale
+`;fut ES` → E-mini S&P latest 5-minute chart
+`;fut ES 15` → E-mini S&P 15-minute chart
+`;fut CL w line` → crude oil weekly line
+`;futures GC 1y` → gold 1-year chart
+Indexes: `;SPX`, `;NDX`, `;DJX`/`;DJI`/`;DJIA`, `;RUT`, `;RUI`, `;VIX`, `;IXIC`, `;OEX`
+
+**Options** (same for stocks and futures)
+Timeframes: stocks support `d`, `w`, `m`, plus intraday `1`, `2`, `3`, `5`, `15`, `30`, `60`, `4h`; futures also support `10`, `2h`
+Types: `candle`, `line`
+Ranges: `1m`, `3m`, `6m`, `ytd`, `1y`, `2y`, `5y`, `max`
+Themes: `dark`, `light`
+Scales: `linear`, `log`, `percent`
+
+Options can be in any order after the ticker.
+
+**Futures** (`;fut`/`;future`/`;futures`): `;f` is still Ford (`F`).
+
+**Freshness**: bare stock and futures commands default to the latest 5-minute chart. Every
+chart image is rendered locally from market chart data.
+"""
+
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=12)
+SECONDARY_FETCH_TIMEOUT = 6
+HTTP_CONNECTION_LIMIT = 32
+HTTP_CONNECTIONS_PER_HOST = 16
+HTTP_KEEPALIVE_SECONDS = 60
+HTTP_DNS_CACHE_SECONDS = 300
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/125.0 Safari/537.36"
+)
+HTTP_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Cache-Control": "no-cache",
+}
+RENDER_EXECUTORS = {"process", "thread"}
+RENDER_MAX_WORKERS = 4
+RENDER_QUEUE_PER_WORKER = 4
+
+intents = discord.Intents.default()
+intents.message_content = True
+client = discord.Client(intents=intents)
+NO_MENTIONS = discord.AllowedMentions.none()
+_http_session: aiohttp.ClientSession | None = None
+chart_response_cache = TTLCache(CHART_CACHE_MAX_ENTRIES)
+chart_url_flights = SingleFlight()
+chart_render_flights = SingleFlight()
+chart_image_cache = ByteLRUCache(CHART_IMAGE_CACHE_MAX_BYTES)
+daily_bar_store = DailyBarStore()
+intraday_series_store = IntradaySeriesStore()
+_bar_store: BarStore | None = None
+bar_store_seeded: set[tuple[str, ...]] = set()
+_render_pool: tuple[Executor, asyncio.Semaphore] | None = None
+
+
+def http_session() -> aiohttp.ClientSession:
+    # One pooled session keeps Yahoo connections warm across commands.
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_CONNECTION_LIMIT,
+            limit_per_host=HTTP_CONNECTIONS_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+            ttl_dns_cache=HTTP_DNS_CACHE_SECONDS,
+        )
+        _http_session = aiohttp.ClientSession(connector=connector, timeout=HTTP_TIMEOUT, headers=HTTP_HEADERS)
+    return _http_session
+
+
+def bar_store() -> BarStore:
+    # Created lazily so BAR_STORE_DIR from .env is honored.
+    global _bar_store
+    if _bar_store is None:
+        _bar_store = bar_store_from_env()
+    return _bar_store
+
+
+async def close_http_session() -> None:
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
+
+def _available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def render_pool() -> tuple[Executor, asyncio.Semaphore]:
+    # Rendering is CPU-bound Pillow work; keep it off the event loop that serves the gateway.
+    global _render_pool
+    if _render_pool is None:
+        kind = os.getenv("RENDER_EXECUTOR", "process").lower()
+        if kind not in RENDER_EXECUTORS:
+            raise SystemExit(f"RENDER_EXECUTOR must be one of: {', '.join(sorted(RENDER_EXECUTORS))}.")
+        workers_setting = os.getenv("RENDER_WORKERS", "").strip()
+        if workers_setting and (not workers_setting.isdigit() or int(workers_setting) < 1):
+            raise SystemExit("RENDER_WORKERS must be a positive whole number.")
+        workers = int(workers_setting or min(RENDER_MAX_WORKERS, _available_cpus()))
+        executor: Executor
+        if kind == "thread":
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render", initializer=warm_chart_renderer)
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_chart_renderer,
+            )
+        # Start every worker now so the first charts skip process spawn, Pillow import and font loading.
+        for _ in range(workers):
+            executor.submit(warm_chart_renderer)
+        # Bound queued renders so a burst waits here instead of piling up inside the executor.
+        _render_pool = executor, asyncio.Semaphore(workers * RENDER_QUEUE_PER_WORKER)
+    return _render_pool
+
+
+def close_render_pool() -> None:
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool[0].shutdown(wait=False, cancel_futures=True)
+    _render_pool = None
+
+
+def chart_image_encoding() -> str:
+    # Chosen per deployment: "optimized" PNG, "fast" PNG, palette "compact" PNG or lossless "webp".
+    encoding = os.getenv("CHART_IMAGE_ENCODING", "optimized").lower()
+    if encoding not in CHART_IMAGE_ENCODINGS:
+        raise SystemExit(f"CHART_IMAGE_ENCODING must be one of: {', '.join(sorted(CHART_IMAGE_ENCODINGS))}.")
+    return encoding
+
+
+def chart_raster() -> str:
+    # "draw" (ImageDraw per shape) unless a deployment measured the NumPy "array" painter faster.
+    raster = os.getenv("CHART_RASTER", "draw").lower()
+    if raster not in CHART_RASTERS:
+        raise SystemExit(f"CHART_RASTER must be one of: {', '.join(sorted(CHART_RASTERS))}.")
+    return raster
+
+
+async def render_chart(quote: dict[str, Any], request: ChartRequest) -> bytes:
+    try:
+        return await _render_in_pool(quote, request)
+    except BrokenProcessPool:
+        # A worker that died (OOM kill, crash) broke the whole pool; retry once on a fresh one.
+        return await _render_in_pool(quote, request)
+
+
+async def _render_in_pool(quote: dict[str, Any], request: ChartRequest) -> bytes:
+    pool = render_pool()
+    executor, slots = pool
+    encoding, raster = chart_image_encoding(), chart_raster()
+    async with slots:
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, render_chart_image, quote, request, encoding, raster
+            )
+        except BrokenProcessPool:
+            if pool is _render_pool:
+                close_render_pool()
+            raise
+
+
+@client.event
+async def on_ready() -> None:
+    http_session()
+    chart_image_encoding()
+    chart_raster()
+    render_pool()
+    print(f"{client.user} is online")
+
+
+@client.event
+async def on_message(message: discord.Message) -> None:
+    if message.author.bot or not message.content.startswith(PREFIX):
+        return
+
+    command_text = message.content[len(PREFIX):].strip()
+    if not command_text:
+        await message.channel.send(HELP_TEXT, allowed_mentions=NO_MENTIONS)
+        return
+    if command_text.split(maxsplit=1)[0].lower() in {"help", "h"}:
+        await message.channel.send(HELP_TEXT, allowed_mentions=NO_MENTIONS)
+        return
+
+    try:
+        request = parse_chart_command(message.content)
+    except ValueError as error:
+        await message.channel.send(str(error), allowed_mentions=NO_MENTIONS)
+        return
+
+    if request:
+        await send_chart(message.channel, request)
+
+
+async def fetch_chart_json(session: aiohttp.ClientSession, url: str) -> tuple[int, Any]:
+    key = chart_cache_key(url)
+    cached = chart_response_cache.get(key)
+    if cached is not None:
+        return 200, cached
+    derived = derive_cached_chart(chart_response_cache, key)
+    if derived is not None:
+        return 200, derived
+    return await chart_url_flights.run(key, lambda: _download_chart_json(session, url, key))
+
+
+async def _download_chart_json(session: aiohttp.ClientSession, url: str, key: tuple[str, ...]) -> tuple[int, Any]:
+    window_start = chart_window_start(key[2], time.time(), key[0].endswith("=F"))
+    persisted = chart_interval_seconds(url) is not None and window_start is not None
+    stored = intraday_series_store.get(key)
+    if stored is None and persisted and window_start is not None and key not in bar_store_seeded:
+        # Only a series this process has never fetched (e.g. after a restart) is seeded from disk.
+        # Once the in-memory series ages out, the full download below re-fetches revised bars.
+        bar_store_seeded.add(key)
+        try:
+            columns = await asyncio.to_thread(bar_store().read, key[0], key[1], key[2], key[3])
+            meta = await asyncio.to_thread(bar_store().read_meta, key[0], key[1], key[2], key[3]) if columns else None
+        except OSError:
+            columns, meta = None, None
+        stored = stored_chart_data(columns, window_start, meta=meta)
+    tail_url = chart_tail_url(url, stored, time.time()) if stored is not None else None
+    if tail_url is not None:
+        try:
+            status, tail = await _get_chart_json(session, tail_url)
+        except (aiohttp.ClientError, TimeoutError, JSONDecodeError, MarketDataProviderError):
+            # A failed tail refresh falls through to the full download below.
+            status, tail = 0, None
+        merged = merge_chart_tail(stored, tail) if status == 200 else None
+        if merged is not None:
+            intraday_series_store.put(key, merged, tail=True)
+            chart_response_cache.set(key, merged, chart_cache_ttl(url, merged))
+            await _persist_chart_bars(key, merged)
+            return 200, merged
+
+    status, data = await _get_chart_json(session, url)
+    if status != 200:
+        return status, None
+    if chart_tail_url(url, data, time.time()) is not None:
+        intraday_series_store.put(key, data)
+        if persisted:
+            await _persist_chart_bars(key, data)
+    chart_response_cache.set(key, data, chart_cache_ttl(url, data))
+    return 200, data
+
+
+async def _persist_chart_bars(key: tuple[str, ...], data: Any) -> None:
+    columns = chart_bar_columns(data)
+    if columns is None:
+        return
+    try:
+        meta = data["chart"]["result"][0].get("meta")
+        await asyncio.to_thread(bar_store().append, key[0], key[1], key[2], key[3], columns, meta)
+    except OSError as error:
+        print(f"bar store write failed for {key[0]} {key[1]}: {error}")
+
+
+async def _get_chart_json(session: aiohttp.ClientSession, url: str) -> tuple[int, Any]:
+    async with session.get(url, headers={"Accept": "application/json"}) as response:
+        if response.status != 200:
+            return response.status, None
+        if (response.content_length or 0) > CHART_PAYLOAD_MAX_BYTES:
+            raise MarketDataProviderError("Market data payload is too large")
+        body = bytearray()
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            body += chunk
+            if len(body) > CHART_PAYLOAD_MAX_BYTES:
+                raise MarketDataProviderError("Market data payload is too large")
+    return 200, decode_chart_json(bytes(body))
+
+
+async def fetch_daily_previous_close(session: aiohttp.ClientSession, request: ChartRequest) -> float | None:
+    symbol = yahoo_chart_symbol(request)
+    stored = daily_bar_store.previous_close(symbol, time.time(), request.futures)
+    if stored is not None:
+        return stored
+    daily_request = ChartRequest(
+        request.ticker,
+        "d",
+        "daily",
+        date_range="m1",
+        date_range_label="1 month",
+        futures=request.futures,
+    )
+    status, data = await fetch_chart_json(session, yahoo_chart_url(daily_request))
+    if status != 200:
+        return None
+
+    chart = data.get("chart") or {}
+    results = chart.get("result") or []
+    if not results:
+        return None
+    raw_quote = ((results[0].get("indicators") or {}).get("quote") or [{}])[0]
+    dates = results[0].get("timestamp") or []
+    closes = raw_quote.get("close") or []
+    daily_bar_store.put(symbol, dates, closes, request.futures)
+    sessions = daily_session_closes(dates, closes, request.futures)
+    return previous_session_close(sessions, time.time(), request.futures)
+
+
+async def fetch_current_day_intraday_quote(session: aiohttp.ClientSession, request: ChartRequest) -> dict[str, Any] | None:
+    intraday_request = ChartRequest(
+        request.ticker,
+        "i1",
+        "1 min",
+        futures=request.futures,
+    )
+    intraday_url = yahoo_chart_url(intraday_request).replace("range=5d", "range=1d").replace(
+        "includePrePost=true",
+        "includePrePost=false",
+    )
+    status, data = await fetch_chart_json(session, intraday_url)
+    if status != 200:
+        return None
+
+    chart = data.get("chart") or {}
+    results = chart.get("result") or []
+    if not results:
+        return None
+    result = results[0]
+    raw_quote = ((result.get("indicators") or {}).get("quote") or [{}])[0]
+    return {
+        "ticker": request.ticker,
+        "futures": request.futures,
+        "date": result.get("timestamp") or [],
+        "open": raw_quote.get("open") or [],
+        "high": raw_quote.get("high") or [],
+        "low": raw_quote.get("low") or [],
+        "close": raw_quote.get("close") or [],
+        "volume": raw_quote.get("volume") or [],
+    }
+
+
+async def fetch_secondary(coro: Awaitable[Any]) -> Any:
+    try:
+        return await asyncio.wait_for(coro, SECONDARY_FETCH_TIMEOUT)
+    except (aiohttp.ClientError, TimeoutError, JSONDecodeError, MarketDataProviderError):
+        return None
+
+
+async def fetch_market_chart_data(session: aiohttp.ClientSession, request: ChartRequest) -> dict[str, Any]:
+    # The daily previous close only needs the request, so it runs alongside the main chart fetch.
+    daily_prev_task = None
+    if request.timeframe != "d":
+        daily_prev_task = asyncio.ensure_future(fetch_secondary(fetch_daily_previous_close(session, request)))
+    try:
+        return await _fetch_market_chart_quote(session, request, daily_prev_task)
+    finally:
+        if daily_prev_task is not None:
+            daily_prev_task.cancel()
+
+
+async def _fetch_market_chart_quote(
+    session: aiohttp.ClientSession,
+    request: ChartRequest,
+    daily_prev_task: asyncio.Task[Any] | None,
+) -> dict[str, Any]:
+    status, data = await fetch_chart_json(session, yahoo_chart_url(request))
+    if status == 404:
+        raise NoChartData(f"No chart data found for `{request.ticker}`.")
+    if status != 200:
+        raise MarketDataProviderError("Market data provider returned an error")
+
+    chart = data.get("chart") or {}
+    error = chart.get("error")
+    if error:
+        code = str(error.get("code") if isinstance(error, dict) else error).lower()
+        description = str(error.get("description") if isinstance(error, dict) else "").lower()
+        if "not found" in code or "not found" in description or "no data" in description:
+            raise NoChartData(f"No chart data found for `{request.ticker}`.")
+        raise MarketDataProviderError("Market data provider returned an error")
+    results = chart.get("result") or []
+    if not results:
+        raise NoChartData(f"No chart data found for `{request.ticker}`.")
+
+    result = results[0]
+    meta = result.get("meta") or {}
+    raw_quote = ((result.get("indicators") or {}).get("quote") or [{}])[0]
+    dates = result.get("timestamp") or []
+    closes = raw_quote.get("close") or []
+    last, last_time = _latest_quote_price_time(meta, dates, closes, request)
+    prev = _stock_previous_close(meta, closes, request)
+    if request.timeframe == "d":
+        daily_bar_store.put(yahoo_chart_symbol(request), dates, closes, request.futures)
+    if daily_prev_task is not None:
+        daily_prev = await daily_prev_task
+        if daily_prev is not None:
+            prev = daily_prev
+    change = (last - prev) if last is not None and prev else None
+    quote = {
+        "ticker": request.ticker,
+        "futures": request.futures,
+        "name": meta.get("shortName") or meta.get("longName") or request.ticker,
+        "date": dates,
+        "open": raw_quote.get("open") or [],
+        "high": raw_quote.get("high") or [],
+        "low": raw_quote.get("low") or [],
+        "close": closes,
+        "volume": raw_quote.get("volume") or [],
+        "lastClose": last,
+        "lastTime": last_time,
+        "prevClose": prev,
+        "perfDayUsd": change,
+        "perfDayPct": (change / prev * 100) if change is not None and prev else None,
+    }
+    # The 1-minute lookup depends on the main result: only a close-only latest daily bar needs it.
+    if request.timeframe == "d" and not request.futures and _has_close_only_latest_ohlc(quote):
+        intraday_quote = await fetch_secondary(fetch_current_day_intraday_quote(session, request))
+        if intraday_quote is not None:
+            quote = _patch_close_only_latest_ohlc(quote, intraday_quote)
+    return aggregate_yahoo_chart_data(quote, request)
+
+
+async def build_chart(request: ChartRequest) -> tuple[dict[str, Any], bytes]:
+    quote = await fetch_market_chart_data(http_session(), request)
+    image_key = chart_image_key(quote, request)
+    image = chart_image_cache.get(image_key)
+    if image is None:
+        image = await render_chart(quote, request)
+        chart_image_cache.set(image_key, image)
+    return quote, image
+
+
+async def send_chart(channel: discord.abc.Messageable, request: ChartRequest) -> None:
+    description = None
+
+    async with channel.typing():
+        try:
+            quote, image = await chart_render_flights.run(request, lambda: build_chart(request))
+            description = quote_description(quote)
+        except NoChartData as error:
+            await channel.send(str(error), allowed_mentions=NO_MENTIONS)
+            return
+        except (aiohttp.ClientError, TimeoutError, JSONDecodeError, MarketDataProviderError):
+            await channel.send("Market data is temporarily unavailable. Try again in a minute.", allowed_mentions=NO_MENTIONS)
+            return
+        except BrokenProcessPool:
+            await channel.send("Chart rendering is temporarily unavailable. Try again in a minute.", allowed_mentions=NO_MENTIONS)
+            return
+
+    extension = CHART_IMAGE_ENCODINGS[chart_image_encoding()]
+    filename = f"{request.ticker}_{request.timeframe}_{int(time.time())}.{extension}"
+    file = discord.File(io.BytesIO(image), filename=filename)
+    embed = discord.Embed(
+        title=chart_title(request),
+        description=description,
+        color=0x2ECC71 if (_safe_float(quote.get("perfDayUsd")) or 0.0) >= 0 else 0xFF5252,
+    )
+    embed.set_image(url=f"attachment://{filename}")
+    try:
+        await channel.send(embed=embed, file=file, allowed_mentions=NO_MENTIONS)
+    except discord.HTTPException:
+        await channel.send("Chart rendered, but Discord rejected the image upload.", allowed_mentions=NO_MENTIONS)
+
+
+async def run_bot(token: str) -> None:
+    try:
+        async with client:
+            await client.start(token)
+    finally:
+        await close_http_session()
+        close_render_pool()
+        print(f"chart response cache: {chart_response_cache.stats()}")
+        print(f"chart image cache: {chart_image_cache.stats()}")
+        print(f"daily bar store: {daily_bar_store.hits} hits, {daily_bar_store.misses} misses")
+        print(
+            f"intraday series: {intraday_series_store.tail_refreshes} tail refreshes, "
+            f"{intraday_series_store.full_refreshes} full refreshes"
+        )
+
+
+def main() -> None:
+    load_dotenv()
+    token = os.getenv("DISCORD_TOKEN")
+    if not token:
+        raise SystemExit("Missing DISCORD_TOKEN. Put it in .env or export it.")
+    discord.utils.setup_logging()
+    try:
+        asyncio.run(run_bot(token))
+    except KeyboardInterrupt:
+        pass
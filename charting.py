@@ -2,11 +2,25 @@ import datetime as dt
 import io
 import math
 import re
-from collections.abc import Callable
+import time
+from collections.abc import Callable, Collection, Iterator, Sequence
 from dataclasses import dataclass
-from typing import Any
+from functools import lru_cache
+from typing import Any, overload
 from urllib.parse import quote, urlencode
-from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from indicators import IndicatorEngine
+from market_calendar import (
+    EARLY_CLOSE_END,
+    MARKET_TIME_ZONE,
+    REGULAR_SESSION_END,
+    REGULAR_SESSION_START,
+    STOCK_5M_END,
+    STOCK_5M_START,
+    nyse_early_closes,
+)
 
 PREFIX = ";"
 DEFAULT_TIMEFRAME = "d"
@@ -19,7 +33,6 @@ DEFAULT_SCALE_FACTOR = 2
 DEFAULT_WIDTH = 640
 DEFAULT_HEIGHT = 239
 CHART_RIGHT_MARGIN = 80
-MARKET_TIME_ZONE = ZoneInfo("America/New_York")
 STOCK_DAILY_VISIBLE_BARS = 140
 STOCK_WEEKLY_VISIBLE_BARS = 160
 STOCK_INTRADAY_VISIBLE_BARS = 150
@@ -36,16 +49,17 @@ DARK_LINE_COLOR = (55, 160, 245)
 DARK_VOLUME_UP = (25, 120, 75)
 DARK_VOLUME_DOWN = (128, 58, 68)
 FUTURES_INTRADAY_VISIBLE_BARS = 120
-STOCK_5M_START = dt.time(4, 0)
-STOCK_5M_END = dt.time(20, 0)
-REGULAR_SESSION_START = dt.time(9, 30)
-REGULAR_SESSION_END = dt.time(16, 0)
 EXTENDED_WICK_PCT_LIMIT = 0.004
 EXTENDED_WICK_RANGE_MULTIPLE = 3.0
 FUTURES_STALE_WICK_RANGE_MULTIPLE = 2.0
 FUTURES_STALE_EXTREME_MIN_REPEATS = 3
 FUTURES_STALE_EXTREME_MIN_FLAGS = 2
 SPARSE_CHART_MIN_BARS = 24
+SESSION_CLOSED = 0
+SESSION_PRE = 1
+SESSION_REGULAR = 2
+SESSION_AFTER = 3
+SESSION_KINDS = {SESSION_PRE: "pre", SESSION_AFTER: "after"}
 
 TIMEFRAMES = {
     "d": ("d", "daily"),
@@ -358,6 +372,173 @@ ChartRow = tuple[int, float, float, float, float, float]
 SessionKey = tuple[str, object]
 
 
+class ChartSeries(Sequence[ChartRow]):
+    # Columnar bars: int64 epochs plus float64 OHLCV. Slices are NumPy views, not copies,
+    # and indexing a single position still yields a plain ChartRow tuple.
+    __slots__ = ("dates", "opens", "highs", "lows", "closes", "volumes", "_calendar")
+    FIELDS = ("dates", "opens", "highs", "lows", "closes", "volumes")
+
+    def __init__(
+        self,
+        dates: np.ndarray,
+        opens: np.ndarray,
+        highs: np.ndarray,
+        lows: np.ndarray,
+        closes: np.ndarray,
+        volumes: np.ndarray,
+    ) -> None:
+        self.dates = dates
+        self.opens = opens
+        self.highs = highs
+        self.lows = lows
+        self.closes = closes
+        self.volumes = volumes
+        self._calendar: MarketCalendarIndex | None = None
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[ChartRow]) -> "ChartSeries":
+        if isinstance(rows, ChartSeries):
+            return rows
+        columns = list(zip(*rows)) or [()] * 6
+        return cls(
+            np.array(columns[0], dtype=np.int64),
+            *(np.array(values, dtype=np.float64) for values in columns[1:]),
+        )
+
+    def columns(self) -> tuple[np.ndarray, ...]:
+        return self.dates, self.opens, self.highs, self.lows, self.closes, self.volumes
+
+    def calendar(self) -> "MarketCalendarIndex":
+        if self._calendar is None:
+            self._calendar = MarketCalendarIndex.from_dates(self.dates)
+        return self._calendar
+
+    def replace(self, **columns: np.ndarray) -> "ChartSeries":
+        current = dict(zip(self.FIELDS, self.columns()))
+        current.update(columns)
+        series = ChartSeries(**current)
+        if "dates" not in columns:
+            series._calendar = self._calendar
+        return series
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @overload
+    def __getitem__(self, index: int) -> ChartRow: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "ChartSeries": ...
+
+    def __getitem__(self, index: int | slice) -> "ChartRow | ChartSeries":
+        if isinstance(index, slice):
+            series = ChartSeries(*(column[index] for column in self.columns()))
+            if self._calendar is not None:
+                series._calendar = self._calendar[index]
+            return series
+        return (
+            int(self.dates[index]),
+            float(self.opens[index]),
+            float(self.highs[index]),
+            float(self.lows[index]),
+            float(self.closes[index]),
+            float(self.volumes[index]),
+        )
+
+    def __iter__(self) -> Iterator[ChartRow]:
+        return zip(*(column.tolist() for column in self.columns()))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (ChartSeries, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+@lru_cache(maxsize=None)
+def _new_york_offset_table(year: int) -> tuple[int, tuple[tuple[int, int], ...]]:
+    # New York's UTC offset on Jan 1 plus each (epoch, new offset) change that year. Offsets
+    # only change on the hour, so scan day by day and then hour by hour inside a changed day.
+    def offset(epoch: int) -> int:
+        delta = dt.datetime.fromtimestamp(epoch, MARKET_TIME_ZONE).utcoffset()
+        return int(delta.total_seconds()) if delta is not None else 0
+
+    start = int(dt.datetime(year, 1, 1, tzinfo=dt.timezone.utc).timestamp())
+    end = int(dt.datetime(year + 1, 1, 1, tzinfo=dt.timezone.utc).timestamp())
+    initial = current = offset(start)
+    changes: list[tuple[int, int]] = []
+    for day in range(start, end, 86400):
+        if offset(day + 86400) == current:
+            continue
+        for hour in range(day + 3600, day + 86400 + 3600, 3600):
+            if (value := offset(hour)) != current:
+                changes.append((hour, value))
+                current = value
+                break
+    return initial, tuple(changes)
+
+
+def _new_york_offsets(dates: np.ndarray) -> np.ndarray:
+    if not len(dates):
+        return np.zeros(0, dtype=np.int64)
+    years = dates.astype("datetime64[s]").astype("datetime64[Y]").astype(np.int64) + 1970
+    initial, _ = _new_york_offset_table(int(years.min()))
+    changes = [
+        change for year in range(int(years.min()), int(years.max()) + 1) for change in _new_york_offset_table(year)[1]
+    ]
+    bounds = np.array([epoch for epoch, _ in changes], dtype=np.int64)
+    offsets = np.array([initial, *(value for _, value in changes)], dtype=np.int64)
+    return offsets[np.searchsorted(bounds, dates, side="right")]
+
+
+def _session_seconds(value: dt.time) -> int:
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+class MarketCalendarIndex:
+    # Per-bar New York calendar fields computed once per series: local day number, seconds
+    # since local midnight, UTC month number and stock session kind (SESSION_* codes).
+    __slots__ = ("local_days", "local_seconds", "utc_months", "sessions")
+
+    def __init__(self, local_days: np.ndarray, local_seconds: np.ndarray, utc_months: np.ndarray, sessions: np.ndarray) -> None:
+        self.local_days = local_days
+        self.local_seconds = local_seconds
+        self.utc_months = utc_months
+        self.sessions = sessions
+
+    @classmethod
+    def from_dates(cls, dates: np.ndarray) -> "MarketCalendarIndex":
+        local_days, local_seconds = np.divmod(dates + _new_york_offsets(dates), 86400)
+        pre, open_, close, after = map(_session_seconds, (STOCK_5M_START, REGULAR_SESSION_START, REGULAR_SESSION_END, STOCK_5M_END))
+        sessions = np.full(len(dates), SESSION_CLOSED, dtype=np.int8)
+        sessions[(local_seconds >= pre) & (local_seconds < open_)] = SESSION_PRE
+        sessions[(local_seconds >= open_) & (local_seconds < close)] = SESSION_REGULAR
+        sessions[(local_seconds >= close) & (local_seconds <= after)] = SESSION_AFTER
+        if len(dates):
+            # NYSE half days end the regular session at 13:00 ET.
+            epoch_day = dt.date(1970, 1, 1)
+            first, last = (epoch_day + dt.timedelta(days=int(day)) for day in (local_days.min(), local_days.max()))
+            early_days = [
+                (day - epoch_day).days for year in range(first.year, last.year + 1) for day in nyse_early_closes(year)
+            ]
+            early_close = _session_seconds(EARLY_CLOSE_END)
+            early_after = np.isin(local_days, early_days) & (local_seconds >= early_close) & (local_seconds < close)
+            sessions[early_after] = SESSION_AFTER
+        utc_months = dates.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+        return cls(local_days, local_seconds, utc_months, sessions)
+
+    def __getitem__(self, index: slice) -> "MarketCalendarIndex":
+        return MarketCalendarIndex(*(getattr(self, field)[index] for field in self.__slots__))
+
+    @property
+    def regular(self) -> np.ndarray:
+        return self.sessions == SESSION_REGULAR
+
+    def local_date(self, pos: int) -> dt.date:
+        return dt.date(1970, 1, 1) + dt.timedelta(days=int(self.local_days[pos]))
+
+
 def _safe_float(value: Any) -> float | None:
     try:
         number = float(value)
@@ -384,26 +565,26 @@ def _range_cutoff(last_epoch: int, date_range: str) -> int | None:
     return int((last - dt.timedelta(days=days)).timestamp()) if days else None
 
 
-def _collapse_monthly_rows(rows: list[ChartRow]) -> list[ChartRow]:
-    collapsed: list[ChartRow] = []
-    last_month: tuple[int, int] | None = None
-    for epoch, open_, high, low, close, volume in rows:
-        stamp = dt.datetime.fromtimestamp(epoch, dt.timezone.utc)
-        month = (stamp.year, stamp.month)
-        if month == last_month:
-            _, prev_open, prev_high, prev_low, _, prev_volume = collapsed[-1]
-            collapsed[-1] = (
-                epoch,
-                prev_open,
-                max(prev_high, high),
-                min(prev_low, low),
-                close,
-                prev_volume + volume,
-            )
-            continue
-        collapsed.append((epoch, open_, high, low, close, volume))
-        last_month = month
-    return collapsed
+def _resample_rows(rows: ChartSeries, buckets: np.ndarray, stamps: np.ndarray) -> ChartSeries:
+    # Each run of equal bucket keys becomes one bar, stamped with the run's last stamp.
+    if not len(rows):
+        return rows
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    ends = np.append(starts[1:], len(rows)) - 1
+    return ChartSeries(
+        stamps[ends].astype(np.int64),
+        rows.opens[starts],
+        np.maximum.reduceat(rows.highs, starts),
+        np.minimum.reduceat(rows.lows, starts),
+        rows.closes[ends],
+        np.add.reduceat(rows.volumes, starts),
+    )
+
+
+def _collapse_monthly_rows(rows: Sequence[ChartRow]) -> ChartSeries:
+    rows = ChartSeries.from_rows(rows)
+    months = rows.dates.astype("datetime64[s]").astype("datetime64[M]")
+    return _resample_rows(rows, months, rows.dates)
 
 
 def _source_interval_seconds(request: ChartRequest) -> int | None:
@@ -415,7 +596,7 @@ def _source_interval_seconds(request: ChartRequest) -> int | None:
     return None
 
 
-def _drop_live_quote_row(rows: list[ChartRow], request: ChartRequest) -> list[ChartRow]:
+def _drop_live_quote_row(rows: ChartSeries, request: ChartRequest) -> ChartSeries:
     interval = _source_interval_seconds(request)
     if interval is None or len(rows) < 2:
         return rows
@@ -429,7 +610,7 @@ def _drop_live_quote_row(rows: list[ChartRow], request: ChartRequest) -> list[Ch
             request.futures
             or epoch % interval != 0
             or epoch - previous_epoch < interval
-            or not _is_regular_stock_session(epoch)
+            or not rows.calendar().regular[-1]
         )
     ):
         return rows[:-1]
@@ -495,30 +676,58 @@ def _patch_close_only_latest_ohlc(quote: dict[str, Any], intraday_quote: dict[st
     return patched
 
 
-def _quote_rows(quote: dict[str, Any], request: ChartRequest) -> list[ChartRow]:
-    dates = quote.get("date") or []
-    opens = quote.get("open") or []
-    highs = quote.get("high") or []
-    lows = quote.get("low") or []
-    closes = quote.get("close") or []
-    volumes = quote.get("volume") or []
-    rows: list[ChartRow] = []
-    last_close = _safe_float(quote.get("lastClose"))
+def _float_column(values: Any, count: int) -> np.ndarray:
+    # Whole-column conversion maps None to NaN; odd cells (text, objects) fall back to _safe_float.
+    try:
+        column = np.array(values[:count], dtype=np.float64)
+    except (TypeError, ValueError):
+        column = np.array([_safe_float(value) for value in values[:count]], dtype=np.float64)
+    column[~np.isfinite(column)] = np.nan
+    return column
+
+
+def _parse_quote_rows(quote: dict[str, Any]) -> ChartSeries:
+    dates, opens, highs, lows, closes, volumes = (
+        [] if quote.get(field) is None else quote[field]
+        for field in ("date", "open", "high", "low", "close", "volume")
+    )
     row_count = min(map(len, (dates, opens, highs, lows, closes)))
-    for i in range(row_count):
-        o, h, l = (_safe_float(values[i]) for values in (opens, highs, lows))
-        c = _safe_float(closes[i])
-        if c is None and i == row_count - 1:
-            c = last_close
-        if o is None or h is None or l is None or c is None:
+    o, h, l, c = (_float_column(values, row_count) for values in (opens, highs, lows, closes))
+    last_close = _safe_float(quote.get("lastClose"))
+    if row_count and np.isnan(c[-1]) and last_close is not None:
+        c[-1] = last_close
+    v = np.zeros(row_count, dtype=np.float64)
+    v[:min(row_count, len(volumes))] = _float_column(volumes, row_count)
+    keep = ~(np.isnan(o) | np.isnan(h) | np.isnan(l) | np.isnan(c))
+    epochs = _float_column(dates, row_count)
+    keep &= ~np.isnan(epochs)
+    o, h, l, c, v, epochs = o[keep], h[keep], l[keep], c[keep], v[keep], epochs[keep]
+    close_only = (c > 0) & (o == 0) & (h == 0) & (l == 0)
+    o, h, l = (np.where(close_only, c, column) for column in (o, h, l))
+    # `+ 0.0` folds -0.0 into 0.0 like the old `value or 0.0`; missing volume is 0.
+    return ChartSeries(epochs.astype(np.int64), o + 0.0, h + 0.0, l + 0.0, c + 0.0, np.nan_to_num(v) + 0.0)
+
+
+def _quote_rows(
+    quote: dict[str, Any],
+    request: ChartRequest,
+    stages: "tuple[tuple[str, ChartRowStage], ...] | None" = None,
+    skip: Collection[str] = (),
+    timings: dict[str, float] | None = None,
+) -> ChartSeries:
+    # Parse once, then run each cleaning stage over the columns; `skip` turns stages off by
+    # name and `timings` collects seconds per stage.
+    started = time.perf_counter()
+    rows = _parse_quote_rows(quote)
+    if timings is not None:
+        timings["parse"] = time.perf_counter() - started
+    for name, stage in QUOTE_ROW_STAGES if stages is None else stages:
+        if name in skip:
             continue
-        if c > 0 and o == h == l == 0:
-            o = h = l = c
-        v = _safe_float(volumes[i]) if i < len(volumes) else 0.0
-        rows.append((int(dates[i]), o or 0.0, h or 0.0, l or 0.0, c or 0.0, v or 0.0))
-    rows = _drop_live_quote_row(rows, request)
-    if request.timeframe == "m":
-        rows = _collapse_monthly_rows(rows)
+        started = time.perf_counter()
+        rows = stage(rows, request)
+        if timings is not None:
+            timings[name] = time.perf_counter() - started
     if not rows:
         raise NoChartData(f"No chart data found for `{request.ticker}`.")
     return rows
@@ -529,56 +738,47 @@ def aggregate_yahoo_chart_data(quote: dict[str, Any], request: ChartRequest) ->
     if bucket_seconds is None:
         return quote
 
-    buckets: list[ChartRow] = []
-    for epoch, open_, high, low, close, volume in _quote_rows(quote, request):
-        bucket_epoch = (epoch // bucket_seconds) * bucket_seconds
-        if not buckets or buckets[-1][0] != bucket_epoch:
-            buckets.append((bucket_epoch, open_, high, low, close, volume))
-            continue
-        prev_epoch, prev_open, prev_high, prev_low, _, prev_volume = buckets[-1]
-        buckets[-1] = (
-            prev_epoch,
-            prev_open,
-            max(prev_high, high),
-            min(prev_low, low),
-            close,
-            prev_volume + volume,
-        )
+    rows = _quote_rows(quote, request)
+    bucket_dates = rows.dates // bucket_seconds * bucket_seconds
+    buckets = _resample_rows(rows, bucket_dates, bucket_dates)
 
     aggregated = dict(quote)
-    aggregated["date"] = [row[0] for row in buckets]
-    aggregated["open"] = [row[1] for row in buckets]
-    aggregated["high"] = [row[2] for row in buckets]
-    aggregated["low"] = [row[3] for row in buckets]
-    aggregated["close"] = [row[4] for row in buckets]
-    aggregated["volume"] = [row[5] for row in buckets]
+    for field, column in zip(("date", "open", "high", "low", "close", "volume"), buckets.columns()):
+        aggregated[field] = column.tolist()
     return aggregated
 
 
-def _stock_5m_today_indexes(rows: list[ChartRow], request: ChartRequest) -> list[int] | None:
+def _epoch_window(dates: np.ndarray, start: float, end: float | None = None) -> range:
+    # Epochs are ascending, so a time window is one contiguous run found by bisection.
+    stop = len(dates) if end is None else int(np.searchsorted(dates, end, side="right"))
+    return range(int(np.searchsorted(dates, start, side="left")), stop)
+
+
+def _stock_5m_today_indexes(rows: Sequence[ChartRow], request: ChartRequest) -> range | None:
     if request.futures or request.timeframe != "i5" or request.date_range:
         return None
-    last_local = dt.datetime.fromtimestamp(rows[-1][0], dt.timezone.utc).astimezone(MARKET_TIME_ZONE)
-    start = dt.datetime.combine(last_local.date(), STOCK_5M_START, MARKET_TIME_ZONE).timestamp()
-    end = dt.datetime.combine(last_local.date(), STOCK_5M_END, MARKET_TIME_ZONE).timestamp()
-    indexes = [i for i, row in enumerate(rows) if start <= row[0] <= end]
+    dates = ChartSeries.from_rows(rows).dates
+    last_date = dt.datetime.fromtimestamp(int(dates[-1]), dt.timezone.utc).astimezone(MARKET_TIME_ZONE).date()
+    start = dt.datetime.combine(last_date, STOCK_5M_START, MARKET_TIME_ZONE).timestamp()
+    end = dt.datetime.combine(last_date, STOCK_5M_END, MARKET_TIME_ZONE).timestamp()
+    indexes = _epoch_window(dates, start, end)
     if len(indexes) >= SPARSE_CHART_MIN_BARS:
         return indexes
-    same_day = [
-        i for i, row in enumerate(rows)
-        if dt.datetime.fromtimestamp(row[0], dt.timezone.utc).astimezone(MARKET_TIME_ZONE).date() == last_local.date()
-    ]
+    midnight = dt.datetime.combine(last_date, dt.time(0), MARKET_TIME_ZONE).timestamp()
+    next_midnight = dt.datetime.combine(last_date + dt.timedelta(days=1), dt.time(0), MARKET_TIME_ZONE).timestamp()
+    same_day = _epoch_window(dates, midnight, next_midnight - 1)
     return same_day if len(same_day) >= SPARSE_CHART_MIN_BARS else None
 
 
-def _visible_indexes(rows: list[ChartRow], request: ChartRequest) -> list[int]:
+def _visible_indexes(rows: Sequence[ChartRow], request: ChartRequest) -> range:
+    rows = ChartSeries.from_rows(rows)
     today_indexes = _stock_5m_today_indexes(rows, request)
     if today_indexes is not None:
         indexes = today_indexes
     elif (cutoff := _range_cutoff(rows[-1][0], request.date_range)) is not None:
-        indexes = [i for i, row in enumerate(rows) if row[0] >= cutoff]
+        indexes = _epoch_window(rows.dates, cutoff)
     elif request.date_range == "max":
-        indexes = list(range(len(rows)))
+        indexes = range(len(rows))
     else:
         if request.timeframe.startswith(("i", "h")):
             count = FUTURES_INTRADAY_VISIBLE_BARS if request.futures else STOCK_INTRADAY_VISIBLE_BARS
@@ -590,40 +790,35 @@ def _visible_indexes(rows: list[ChartRow], request: ChartRequest) -> list[int]:
             count = STOCK_MONTHLY_VISIBLE_BARS
         else:
             count = {"d": 90, "w": 104, "m": 120}.get(request.timeframe, 90)
-        indexes = list(range(max(0, len(rows) - count), len(rows)))
+        indexes = range(max(0, len(rows) - count), len(rows))
     if len(indexes) < 2:
         raise NoChartData(f"Too little chart data found for `{request.ticker}`.")
     return indexes
 
 
+def _epoch_session(epoch: int) -> tuple[int, dt.date]:
+    calendar = MarketCalendarIndex.from_dates(np.array([epoch], dtype=np.int64))
+    return int(calendar.sessions[0]), calendar.local_date(0)
+
+
 def _is_regular_stock_session(epoch: int) -> bool:
-    local_time = dt.datetime.fromtimestamp(epoch, dt.timezone.utc).astimezone(MARKET_TIME_ZONE).time()
-    return REGULAR_SESSION_START <= local_time < REGULAR_SESSION_END
+    return _epoch_session(epoch)[0] == SESSION_REGULAR
 
 
 def _stock_extended_session_key(epoch: int) -> SessionKey | None:
-    local = dt.datetime.fromtimestamp(epoch, dt.timezone.utc).astimezone(MARKET_TIME_ZONE)
-    local_time = local.time()
-    if STOCK_5M_START <= local_time < REGULAR_SESSION_START:
-        return "pre", local.date()
-    if REGULAR_SESSION_END <= local_time <= STOCK_5M_END:
-        return "after", local.date()
-    return None
+    session, local_date = _epoch_session(epoch)
+    return (SESSION_KINDS[session], local_date) if session in SESSION_KINDS else None
 
 
 def _futures_globex_session_key(epoch: int) -> SessionKey | None:
-    local_time = dt.datetime.fromtimestamp(epoch, dt.timezone.utc).astimezone(MARKET_TIME_ZONE).time()
-    if REGULAR_SESSION_START <= local_time < REGULAR_SESSION_END:
-        return None
-    return "globex", "globex"
+    return None if _is_regular_stock_session(epoch) else ("globex", "globex")
 
 
 def _extended_session_bands(
-    rows: list[ChartRow],
+    session_keys: Sequence[SessionKey | None],
     x_positions: list[int],
     left: int,
     plot_right: int,
-    session_key_for_epoch: Callable[[int], SessionKey | None],
 ) -> list[tuple[int, int, str]]:
     bands: list[tuple[int, int, str]] = []
     active: SessionKey | None = None
@@ -635,8 +830,7 @@ def _extended_session_bands(
         if band_right > band_left:
             bands.append((band_left, band_right, kind))
 
-    for pos, row in enumerate(rows):
-        key = session_key_for_epoch(row[0])
+    for pos, key in enumerate(session_keys):
         if key == active:
             continue
         if active is not None:
@@ -645,102 +839,104 @@ def _extended_session_bands(
         start_pos = pos
 
     if active is not None:
-        append_band(start_pos, len(rows) - 1, active[0])
+        append_band(start_pos, len(session_keys) - 1, active[0])
     return bands
 
 
 def _stock_extended_session_bands(
-    rows: list[ChartRow],
+    rows: Sequence[ChartRow],
     x_positions: list[int],
     left: int,
     plot_right: int,
 ) -> list[tuple[int, int, str]]:
-    return _extended_session_bands(rows, x_positions, left, plot_right, _stock_extended_session_key)
+    calendar = ChartSeries.from_rows(rows).calendar()
+    keys = [
+        (SESSION_KINDS[session], day) if session in SESSION_KINDS else None
+        for session, day in zip(calendar.sessions.tolist(), calendar.local_days.tolist())
+    ]
+    return _extended_session_bands(keys, x_positions, left, plot_right)
 
 
 def _futures_globex_session_bands(
-    rows: list[ChartRow],
+    rows: Sequence[ChartRow],
     x_positions: list[int],
     left: int,
     plot_right: int,
 ) -> list[tuple[int, int, str]]:
-    return _extended_session_bands(rows, x_positions, left, plot_right, _futures_globex_session_key)
-
-
-def _clean_stock_extended_wicks(rows: list[ChartRow], request: ChartRequest) -> list[ChartRow]:
-    if request.futures or not request.timeframe.startswith(("i", "h")):
-        return rows
-    regular_ranges = sorted(
-        max(0.0, row[2] - row[3])
-        for row in rows
-        if _is_regular_stock_session(row[0])
-    )
-    typical_range = regular_ranges[len(regular_ranges) // 2] if regular_ranges else 0.0
-    threshold = max(abs(rows[-1][4]) * EXTENDED_WICK_PCT_LIMIT, typical_range * EXTENDED_WICK_RANGE_MULTIPLE, 0.0001)
-    cleaned: list[ChartRow] = []
-    for epoch, open_, high, low, close, volume in rows:
-        body_high = max(open_, close)
-        body_low = min(open_, close)
-        if not _is_regular_stock_session(epoch):
-            if body_low - low > threshold:
-                low = body_low
-            if high - body_high > threshold:
-                high = body_high
-        cleaned.append((epoch, open_, max(high, body_high), min(low, body_low), close, volume))
-    return cleaned
-
-
-def _price_key(value: float) -> float:
-    return round(value, 8)
-
-
-def _clean_futures_intraday_wicks(rows: list[ChartRow], request: ChartRequest) -> list[ChartRow]:
-    if not request.futures or not request.timeframe.startswith(("i", "h")):
-        return rows
-    ranges = sorted(max(0.0, row[2] - row[3]) for row in rows if row[2] >= row[3])
-    typical_range = ranges[len(ranges) // 2] if ranges else 0.0
-    threshold = max(abs(rows[-1][4]) * 0.0004, typical_range * FUTURES_STALE_WICK_RANGE_MULTIPLE, 0.0001)
-    high_counts: dict[float, int] = {}
-    low_counts: dict[float, int] = {}
-    high_flags: dict[float, int] = {}
-    low_flags: dict[float, int] = {}
-
-    for epoch, open_, high, low, close, _ in rows:
-        if _futures_globex_session_key(epoch) is None:
-            continue
-        body_high = max(open_, close)
-        body_low = min(open_, close)
-        high_key = _price_key(high)
-        low_key = _price_key(low)
-        high_counts[high_key] = high_counts.get(high_key, 0) + 1
-        low_counts[low_key] = low_counts.get(low_key, 0) + 1
-        if high - body_high > threshold:
-            high_flags[high_key] = high_flags.get(high_key, 0) + 1
-        if body_low - low > threshold:
-            low_flags[low_key] = low_flags.get(low_key, 0) + 1
-
-    stale_highs = {
-        value for value, count in high_counts.items()
-        if count >= FUTURES_STALE_EXTREME_MIN_REPEATS and high_flags.get(value, 0) >= FUTURES_STALE_EXTREME_MIN_FLAGS
-    }
-    stale_lows = {
-        value for value, count in low_counts.items()
-        if count >= FUTURES_STALE_EXTREME_MIN_REPEATS and low_flags.get(value, 0) >= FUTURES_STALE_EXTREME_MIN_FLAGS
-    }
-    if not stale_highs and not stale_lows:
-        return rows
-
-    cleaned: list[ChartRow] = []
-    for epoch, open_, high, low, close, volume in rows:
-        body_high = max(open_, close)
-        body_low = min(open_, close)
-        if _futures_globex_session_key(epoch) is not None:
-            if _price_key(high) in stale_highs and high > body_high:
-                high = body_high
-            if _price_key(low) in stale_lows and low < body_low:
-                low = body_low
-        cleaned.append((epoch, open_, max(high, body_high), min(low, body_low), close, volume))
-    return cleaned
+    globex: SessionKey = ("globex", "globex")
+    keys = [None if regular else globex for regular in ChartSeries.from_rows(rows).calendar().regular.tolist()]
+    return _extended_session_bands(keys, x_positions, left, plot_right)
+
+
+def _clean_stock_extended_wicks(rows: Sequence[ChartRow], request: ChartRequest) -> ChartSeries:
+    series = ChartSeries.from_rows(rows)
+    if request.futures or not request.timeframe.startswith(("i", "h")) or not len(series):
+        return series
+    regular = series.calendar().regular
+    typical_range = _upper_median(np.maximum(0.0, series.highs - series.lows)[regular])
+    threshold = max(abs(float(series.closes[-1])) * EXTENDED_WICK_PCT_LIMIT, typical_range * EXTENDED_WICK_RANGE_MULTIPLE, 0.0001)
+    body_high = np.maximum(series.opens, series.closes)
+    body_low = np.minimum(series.opens, series.closes)
+    highs = np.where(~regular & (series.highs - body_high > threshold), body_high, series.highs)
+    lows = np.where(~regular & (body_low - series.lows > threshold), body_low, series.lows)
+    return series.replace(highs=np.maximum(highs, body_high), lows=np.minimum(lows, body_low))
+
+
+def _upper_median(values: np.ndarray) -> float:
+    # The element a full sort would put at len // 2, found by linear-time selection.
+    if not len(values):
+        return 0.0
+    middle = len(values) // 2
+    return float(np.partition(values, middle)[middle])
+
+
+def _price_keys(values: np.ndarray) -> np.ndarray:
+    # Prices rounded like round(value, 8), computed once per distinct price.
+    distinct, inverse = np.unique(values, return_inverse=True)
+    return np.array([round(value, 8) for value in distinct.tolist()], dtype=np.float64)[inverse]
+
+
+def _stale_extremes(keys: np.ndarray, globex: np.ndarray, flagged: np.ndarray) -> np.ndarray:
+    # Globex price levels that repeat and keep showing up as outsized wicks.
+    levels, inverse, counts = np.unique(keys[globex], return_inverse=True, return_counts=True)
+    flags = np.bincount(inverse, weights=flagged[globex], minlength=len(levels))
+    return levels[(counts >= FUTURES_STALE_EXTREME_MIN_REPEATS) & (flags >= FUTURES_STALE_EXTREME_MIN_FLAGS)]
+
+
+def _clean_futures_intraday_wicks(rows: Sequence[ChartRow], request: ChartRequest) -> ChartSeries:
+    series = ChartSeries.from_rows(rows)
+    if not request.futures or not request.timeframe.startswith(("i", "h")) or not len(series):
+        return series
+    typical_range = _upper_median((series.highs - series.lows)[series.highs >= series.lows])
+    threshold = max(abs(float(series.closes[-1])) * 0.0004, typical_range * FUTURES_STALE_WICK_RANGE_MULTIPLE, 0.0001)
+    globex = ~series.calendar().regular
+    body_high = np.maximum(series.opens, series.closes)
+    body_low = np.minimum(series.opens, series.closes)
+    high_keys = _price_keys(series.highs)
+    low_keys = _price_keys(series.lows)
+    stale_highs = _stale_extremes(high_keys, globex, series.highs - body_high > threshold)
+    stale_lows = _stale_extremes(low_keys, globex, body_low - series.lows > threshold)
+    if not len(stale_highs) and not len(stale_lows):
+        return series
+    highs = np.where(globex & np.isin(high_keys, stale_highs) & (series.highs > body_high), body_high, series.highs)
+    lows = np.where(globex & np.isin(low_keys, stale_lows) & (series.lows < body_low), body_low, series.lows)
+    return series.replace(highs=np.maximum(highs, body_high), lows=np.minimum(lows, body_low))
+
+
+def _collapse_monthly_stage(rows: ChartSeries, request: ChartRequest) -> ChartSeries:
+    return _collapse_monthly_rows(rows) if request.timeframe == "m" else rows
+
+
+ChartRowStage = Callable[[ChartSeries, ChartRequest], ChartSeries]
+QUOTE_ROW_STAGES: tuple[tuple[str, ChartRowStage], ...] = (
+    ("live_quote", _drop_live_quote_row),
+    ("monthly", _collapse_monthly_stage),
+)
+# Stock and futures wick cleaning never both apply, so rendered rows get at most one wick pass.
+CHART_ROW_STAGES = QUOTE_ROW_STAGES + (
+    ("stock_wicks", _clean_stock_extended_wicks),
+    ("futures_wicks", _clean_futures_intraday_wicks),
+)
 
 
 def _chart_x_positions(count: int, left: int, plot_w: int) -> list[int]:
@@ -751,13 +947,14 @@ def _chart_x_positions(count: int, left: int, plot_w: int) -> list[int]:
     return [left + round(pos * (plot_w - 1) / max(count - 1, 1)) for pos in range(count)]
 
 
-def _sma_values(rows: list[ChartRow], period: int) -> list[float | None]:
+def _sma_values(rows: Sequence[ChartRow], period: int) -> list[float | None]:
+    closes = ChartSeries.from_rows(rows).closes.tolist()
     values: list[float | None] = []
     total = 0.0
-    for i, row in enumerate(rows):
-        total += row[4]
+    for i, close in enumerate(closes):
+        total += close
         if i >= period:
-            total -= rows[i - period][4]
+            total -= closes[i - period]
         values.append(total / period if i >= period - 1 else None)
     return values
 
@@ -816,9 +1013,10 @@ def _volume_axis(value: float, request: ChartRequest) -> tuple[float, list[float
     return high, ticks
 
 
-def _volume_scale_value(rows: list[ChartRow], request: ChartRequest) -> float:
-    values = sorted(row[5] for row in rows if row[5] > 0)
-    return values[-1] if values else 0
+def _volume_scale_value(rows: Sequence[ChartRow], request: ChartRequest) -> float:
+    volumes = ChartSeries.from_rows(rows).volumes
+    positive = volumes[volumes > 0]
+    return float(positive.max()) if len(positive) else 0
 
 
 def _date_label(epoch: int, intraday: bool, span: int) -> str:
@@ -842,9 +1040,128 @@ def _x_grid_line_styles(x_ticks: list[tuple[int, str]], quarterly_grid: bool) ->
     return [(idx, position % 3 == 0) for position, (idx, _) in enumerate(x_ticks)]
 
 
-def render_price_chart_png(quote: dict[str, Any], request: ChartRequest) -> bytes:
+def _paint_rects(image: Any, rects: np.ndarray, colors: np.ndarray) -> None:
+    # Fill inclusive (x0, y0, x1, y1) rects with one buffer write. Where rects overlap the later one
+    # wins, exactly as successive ImageDraw.rectangle calls would paint them.
+    from PIL import Image
+
+    x0 = np.maximum(rects[:, 0], 0)
+    y0 = np.maximum(rects[:, 1], 0)
+    x1 = np.minimum(rects[:, 2], image.width - 1)
+    y1 = np.minimum(rects[:, 3], image.height - 1)
+    widths = np.where(y1 >= y0, np.maximum(x1 - x0 + 1, 0), 0)
+    if not widths.any():
+        return
+    # One span per rect column, then one flat offset per pixel walking down each span.
+    span_rect = np.repeat(np.arange(len(rects)), widths)
+    span_x = x0[span_rect] + np.arange(len(span_rect)) - np.repeat(np.cumsum(widths) - widths, widths)
+    span_top, span_heights = y0[span_rect], (y1 - y0 + 1)[span_rect]
+    left, top = int(span_x.min()), int(span_top.min())
+    box = (left, top, int(span_x.max()) + 1, int(y1[widths > 0].max()) + 1)
+    box_w = box[2] - left
+    span_start = (span_top - top) * box_w + span_x - left
+    span_end = span_start + (span_heights - 1) * box_w
+    steps = np.full(int(span_heights.sum()), box_w, dtype=np.int64)
+    steps[np.cumsum(span_heights) - span_heights] = span_start - np.concatenate(([0], span_end[:-1]))
+    owners = np.full((box[3] - top) * box_w, -1, dtype=np.int64)
+    np.maximum.at(owners, np.cumsum(steps), np.repeat(span_rect, span_heights))
+    painted = np.flatnonzero(owners >= 0)
+    region = np.asarray(image.crop(box)).copy()
+    region.reshape(-1, 3)[painted] = colors[owners[painted]]
+    image.paste(Image.fromarray(region), box)
+
+
+@lru_cache(maxsize=64)
+def _dash_mask(length: int, dash: int, gap: int, vertical: bool) -> Any:
+    # One paste mask per gridline shape: dashes of `dash` + 1 pixels every `dash + gap`, as the
+    # per-dash line calls drew them; no dash starts on the final pixel.
+    from PIL import Image
+
+    offsets = np.arange(length + 1)
+    phase = offsets % (dash + gap)
+    on = (phase <= dash) & ~((offsets == length) & (phase == 0))
+    pattern = np.where(on, 255, 0).astype(np.uint8)
+    return Image.fromarray(pattern[:, None] if vertical else pattern[None, :])
+
+
+@lru_cache(maxsize=8)
+def _chart_base_image(
+    size: tuple[int, int],
+    bg: tuple[int, int, int],
+    text: tuple[int, int, int],
+    period_label: str,
+    price_span: tuple[int, int],
+) -> Any:
+    # Background plus the rotated weekly/monthly label; renders copy it instead of redrawing.
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", size, bg)
+    if period_label:
+        label_img = Image.new("RGBA", (220, 42), (0, 0, 0, 0))
+        ImageDraw.Draw(label_img).text((0, 0), period_label, fill=text + (255,), font=chart_font("sans", 14))
+        label_img = label_img.crop(label_img.getbbox() or (0, 0, 1, 1)).rotate(90, expand=True)
+        price_top, price_bottom = price_span
+        image.paste(label_img, (18, price_top + (price_bottom - price_top - label_img.height) // 2), label_img)
+    return image
+
+
+# Per render process: repeat renders of a chart only step indicators over its changed bars.
+indicator_engine = IndicatorEngine()
+
+# Chart image encoding -> file extension. "optimized" is the smallest PNG zlib finds without a palette.
+CHART_IMAGE_ENCODINGS = {"optimized": "png", "fast": "png", "compact": "png", "webp": "webp"}
+# "draw" issues one ImageDraw call per candle shape; "array" paints the same pixels in one NumPy pass.
+CHART_RASTERS = {"draw", "array"}
+SMA_SUPERSAMPLE = 4
+# Output pixels kept around the SMA lines: the 1.25px stroke plus LANCZOS's 3px support, doubled
+# so the reduced box matches a full-canvas reduction.
+SMA_MASK_PADDING = 8
+
+FONT_FACES = {
+    "sans": ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "DejaVuSans.ttf"),
+    "sans_bold": ("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", "DejaVuSans-Bold.ttf"),
+    "date": (
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+        "/usr/share/fonts/opentype/urw-base35/NimbusSans-Regular.otf",
+    ),
+}
+CHART_FONTS = (("sans", 14), ("sans", 16), ("sans", 18), ("sans_bold", 17), ("date", 11))
+
+
+@lru_cache(maxsize=None)
+def _font_path(face: str) -> str | None:
+    from PIL import ImageFont
+
+    for path in FONT_FACES[face]:
+        try:
+            ImageFont.truetype(path, 10)
+        except OSError:
+            continue
+        return path
+    return None
+
+
+@lru_cache(maxsize=None)
+def chart_font(face: str, size: int) -> Any:
+    # Parsed once per process; renders share the loaded faces.
+    from PIL import ImageFont
+
+    path = _font_path(face)
+    if path is not None:
+        return ImageFont.truetype(path, size)
+    if face == "date":
+        return chart_font("sans", size)
+    return ImageFont.load_default()
+
+
+def render_price_chart_png(
+    quote: dict[str, Any],
+    request: ChartRequest,
+    encoding: str = "optimized",
+    raster: str = "draw",
+) -> bytes:
     # Pillow keeps text crisp without pulling in a full charting framework.
-    from PIL import Image, ImageDraw, ImageFont
+    from PIL import Image, ImageDraw
 
     width, height = DEFAULT_WIDTH * DEFAULT_SCALE_FACTOR, DEFAULT_HEIGHT * DEFAULT_SCALE_FACTOR
     dark = request.theme == "dark"
@@ -867,36 +1184,13 @@ def render_price_chart_png(quote: dict[str, Any], request: ChartRequest) -> byte
     sma_alpha = 0.82 if dark else 0.72
     sma_colors = {period: _blend_rgb(SMA_COLORS[period], bg, sma_alpha) for period in SMA_PERIODS}
 
-    def font(size: int, bold: bool = False) -> Any:
-        name = "DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf"
-        for path in (f"/usr/share/fonts/truetype/dejavu/{name}", name):
-            try:
-                return ImageFont.truetype(path, size)
-            except OSError:
-                pass
-        return ImageFont.load_default()
-
-    def date_font(size: int) -> Any:
-        for path in (
-            "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-            "/usr/share/fonts/opentype/urw-base35/NimbusSans-Regular.otf",
-        ):
-            try:
-                return ImageFont.truetype(path, size)
-            except OSError:
-                pass
-        return font(size)
-
-    header_font = font(18)
-    label_font = font(17, True)
-    axis_font = font(18)
-    date_axis_font = date_font(11)
-    small_font = font(14)
-    badge_font = font(17, True)
-    sma_font = font(16)
-
-    image = Image.new("RGB", (width, height), bg)
-    draw = ImageDraw.Draw(image)
+    header_font = chart_font("sans", 18)
+    label_font = chart_font("sans_bold", 17)
+    axis_font = chart_font("sans", 18)
+    date_axis_font = chart_font("date", 11)
+    small_font = chart_font("sans", 14)
+    badge_font = chart_font("sans_bold", 17)
+    sma_font = chart_font("sans", 16)
 
     left, right, top, bottom = 60, CHART_RIGHT_MARGIN, 34, 30
     volume_h, gap = 68, 8
@@ -904,14 +1198,17 @@ def render_price_chart_png(quote: dict[str, Any], request: ChartRequest) -> byte
     price_top, price_bottom = top, vol_top - gap
     plot_right = width - right
     plot_w = plot_right - left
-    all_rows = _clean_futures_intraday_wicks(_clean_stock_extended_wicks(_quote_rows(quote, request), request), request)
+    period_shell = request.timeframe in {"w", "m"} and not intraday
+    period_label = request.timeframe_label.upper() if period_shell else ""
+    image = _chart_base_image((width, height), bg, text, period_label, (price_top, price_bottom)).copy()
+    draw = ImageDraw.Draw(image)
+    all_rows = _quote_rows(quote, request, CHART_ROW_STAGES)
     indexes = _visible_indexes(all_rows, request)
-    rows = [all_rows[i] for i in indexes]
-    base = rows[0][4]
+    rows = all_rows[indexes.start:indexes.stop]
+    base = float(rows.closes[0])
     if request.scale == "percentage" and base == 0:
         raise NoChartData(f"Chart data has a zero starting price for `{request.ticker}`, so percent scale won't work.")
-    span = rows[-1][0] - rows[0][0]
-    period_shell = request.timeframe in {"w", "m"} and not intraday
+    span = int(rows.dates[-1] - rows.dates[0])
 
     def scaled(value: float) -> float:
         if request.scale == "percentage":
@@ -922,10 +1219,29 @@ def render_price_chart_png(quote: dict[str, Any], request: ChartRequest) -> byte
             return math.log(value)
         return value
 
-    smas = {period: _sma_values(all_rows, period) for period in SMA_PERIODS}
-    candles = [(i, d, scaled(o), scaled(h), scaled(l), scaled(c), v) for i, (d, o, h, l, c, v) in zip(indexes, rows)]
-    scale_values = [value for _, _, o, h, l, c, _ in candles for value in (o, h, l, c)]
-    low, high = min(scale_values), max(scale_values)
+    def scaled_column(values: np.ndarray) -> np.ndarray:
+        if request.scale == "percentage":
+            return ((values / base) - 1.0) * 100.0
+        if request.scale == "logarithmic":
+            if (values <= 0).any():
+                raise NoChartData(f"Chart data has non-positive values for `{request.ticker}`, so log scale won't work.")
+            return np.log(values)
+        return values
+
+    # State follows the fetched series (symbol, interval, fetch range) plus any local aggregation, so
+    # only requests that start from the same bars share it: `d` and `d 1y` both fetch 2y, `d 5y` 10y.
+    indicator_key = (
+        yahoo_chart_symbol(request),
+        YAHOO_TIMEFRAME_INTERVALS.get(request.timeframe),
+        _yahoo_chart_range(request),
+        YAHOO_AGGREGATE_SECONDS.get(request.timeframe),
+    )
+    # Only the visible window is drawn, so the averages start there (seeded from one period of lookback).
+    smas = {period: indicator_engine.sma(indicator_key, all_rows, period, indexes.start) for period in SMA_PERIODS}
+    scaled_columns = [scaled_column(column) for column in (rows.opens, rows.highs, rows.lows, rows.closes)]
+    candles = list(zip(*(column.tolist() for column in scaled_columns), rows.volumes.tolist()))
+    low = float(min(column.min() for column in scaled_columns))
+    high = float(max(column.max() for column in scaled_columns))
     if high == low:
         high += 1
         low -= 1
@@ -962,6 +1278,9 @@ def render_price_chart_png(quote: dict[str, Any], request: ChartRequest) -> byte
     def y_at(value: float) -> int:
         return round(price_y_at(value))
 
+    def y_columns(values: np.ndarray) -> np.ndarray:
+        return np.round(price_bottom - (values - low) * (price_bottom - price_top) / (high - low)).astype(np.int64)
+
     draw_bottom = vol_bottom
 
     def clip_price_segment(
@@ -998,16 +1317,11 @@ def render_price_chart_png(quote: dict[str, Any], request: ChartRequest) -> byte
         dash: int = 8,
         gap: int = 6,
     ) -> None:
-        if y1 == y2:
-            x = x1
-            while x < x2:
-                draw.line((x, y1, min(x + dash, x2), y2), fill=color, width=1)
-                x += dash + gap
-        else:
-            y = y1
-            while y < y2:
-                draw.line((x1, y, x2, min(y + dash, y2)), fill=color, width=1)
-                y += dash + gap
+        vertical = y1 != y2
+        length = y2 - y1 if vertical else x2 - x1
+        if length > 0:
+            mask = _dash_mask(length, dash, gap, vertical)
+            image.paste(color, (x1, y1, x1 + mask.width, y1 + mask.height), mask)
 
     for x1, x2, kind in session_bands:
         draw.rectangle((x1, price_top, x2, vol_bottom), fill=session_fills[kind])
@@ -1022,20 +1336,12 @@ def render_price_chart_png(quote: dict[str, Any], request: ChartRequest) -> byte
             draw.text((plot_right + 8, y - 11), _axis_label(value, request), fill=text, font=axis_font)
     x_ticks: list[tuple[int, str]]
     if request.timeframe == "m" and not intraday:
-        x_ticks = [
-            (pos, dt.datetime.fromtimestamp(row[0], dt.timezone.utc).strftime("%Y"))
-            for pos, row in enumerate(rows)
-            if dt.datetime.fromtimestamp(row[0], dt.timezone.utc).month == 1
-        ]
+        months = rows.calendar().utc_months
+        x_ticks = [(pos, str(1970 + int(months[pos]) // 12)) for pos in np.flatnonzero(months % 12 == 0).tolist()]
     elif not intraday and len(rows) >= SPARSE_CHART_MIN_BARS:
-        x_ticks = []
-        previous_month: tuple[int, int] | None = None
-        for pos, row in enumerate(rows):
-            stamp = dt.datetime.fromtimestamp(row[0], dt.timezone.utc)
-            month = (stamp.year, stamp.month)
-            if month != previous_month:
-                x_ticks.append((pos, _month_tick_label(row[0], span)))
-                previous_month = month
+        months = rows.calendar().utc_months
+        month_starts = np.flatnonzero(np.concatenate(([True], months[1:] != months[:-1]))).tolist()
+        x_ticks = [(pos, _month_tick_label(int(rows.dates[pos]), span)) for pos in month_starts]
         max_x_ticks = 48 if span >= 400 * 86400 else 20
         if not 4 <= len(x_ticks) <= max_x_ticks:
             x_ticks = []
@@ -1084,47 +1390,92 @@ def render_price_chart_png(quote: dict[str, Any], request: ChartRequest) -> byte
         return left, left + candle_w - 1
 
     close_points: list[tuple[int, int]] = []
-    for pos, (_, _, o, h, l, c, v) in enumerate(candles):
-        x = x_at(pos)
-        color = up if c >= o else down
-        vh = min(vol_bottom - vol_top, round((v / vol_axis_high) * (vol_bottom - vol_top)))
-        bar_left, bar_right = bar_bounds(x)
-        draw.rectangle((bar_left, vol_bottom - vh, bar_right, vol_bottom), fill=vol_up if c >= o else vol_down)
+    if raster == "array":
+        xs = np.asarray(x_positions, dtype=np.int64)
+        bar_lefts = xs - candle_w // 2
+        bar_rights = bar_lefts + candle_w - 1
+        rising = scaled_columns[3] >= scaled_columns[0]
+        vol_span = vol_bottom - vol_top
+        vhs = np.minimum(vol_span, np.round(rows.volumes / vol_axis_high * vol_span).astype(np.int64))
+        vol_bottoms = np.full(len(xs), vol_bottom)
+        layers = [np.stack((bar_lefts, vol_bottom - vhs, bar_rights, vol_bottoms), axis=1)]
+        layer_colors = [np.where(rising[:, None], np.array(vol_up, dtype=np.uint8), np.array(vol_down, dtype=np.uint8))]
         if request.chart_type == "l":
-            close_points.append((x, y_at(c)))
-            continue
-        yo, yh, yl, yc = y_at(o), y_at(h), y_at(l), y_at(c)
-        draw.line((x, yh, x, yl), fill=color, width=1)
-        draw.rectangle((bar_left, min(yo, yc), bar_right, max(yo, yc)), fill=color)
+            close_points = list(zip(x_positions, y_columns(scaled_columns[3]).tolist()))
+        else:
+            yo, yh, yl, yc = (y_columns(column) for column in scaled_columns)
+            candle_colors = np.where(rising[:, None], np.array(up, dtype=np.uint8), np.array(down, dtype=np.uint8))
+            layers += [
+                np.stack((xs, np.minimum(yh, yl), xs, np.maximum(yh, yl)), axis=1),
+                np.stack((bar_lefts, np.minimum(yo, yc), bar_rights, np.maximum(yo, yc)), axis=1),
+            ]
+            layer_colors += [candle_colors, candle_colors]
+        # Interleave per bar (volume, wick, body) to keep the ImageDraw paint order.
+        _paint_rects(
+            image,
+            np.stack(layers, axis=1).reshape(-1, 4),
+            np.stack(layer_colors, axis=1).reshape(-1, 3),
+        )
+    else:
+        for pos, (o, h, l, c, v) in enumerate(candles):
+            x = x_at(pos)
+            color = up if c >= o else down
+            vh = min(vol_bottom - vol_top, round((v / vol_axis_high) * (vol_bottom - vol_top)))
+            bar_left, bar_right = bar_bounds(x)
+            draw.rectangle((bar_left, vol_bottom - vh, bar_right, vol_bottom), fill=vol_up if c >= o else vol_down)
+            if request.chart_type == "l":
+                close_points.append((x, y_at(c)))
+                continue
+            yo, yh, yl, yc = y_at(o), y_at(h), y_at(l), y_at(c)
+            draw.line((x, yh, x, yl), fill=color, width=1)
+            draw.rectangle((bar_left, min(yo, yc), bar_right, max(yo, yc)), fill=color)
     if close_points:
         draw.line(close_points, fill=line_color, width=2, joint="curve")
 
-    sma_scale = 4
-    sma_masks = {period: Image.new("L", (width * sma_scale, height * sma_scale), 0) for period in SMA_PERIODS}
-    sma_draws = {period: ImageDraw.Draw(mask) for period, mask in sma_masks.items()}
+    # SMA lines are drawn supersampled and LANCZOS-reduced for smooth edges. Only the box the lines
+    # reach (padded past the filter's support) is supersampled, reusing one mask for every period.
+    sma_scale = SMA_SUPERSAMPLE
+    sma_segments: dict[int, list[tuple[int, int, int, int]]] = {}
     for period, values in smas.items():
         points: list[tuple[float, float]] = []
         for pos, i in enumerate(indexes):
             value = values[i]
             if value is not None:
                 points.append((float(x_at(pos)), price_y_at(scaled(value))))
+        segments = sma_segments[period] = []
         for start, end in zip(points, points[1:]):
             clipped = clip_price_segment(start, end)
             if clipped is not None:
                 (x1, y1), (x2, y2) = clipped
-                sma_draws[period].line(
-                    (
-                        round(x1 * sma_scale),
-                        round(y1 * sma_scale),
-                        round(x2 * sma_scale),
-                        round(y2 * sma_scale),
-                    ),
+                segments.append((
+                    round(x1 * sma_scale),
+                    round(y1 * sma_scale),
+                    round(x2 * sma_scale),
+                    round(y2 * sma_scale),
+                ))
+    sma_xs = [x for segments in sma_segments.values() for segment in segments for x in segment[::2]]
+    sma_ys = [y for segments in sma_segments.values() for segment in segments for y in segment[1::2]]
+    if sma_xs:
+        box_left = max(0, min(sma_xs) // sma_scale - SMA_MASK_PADDING)
+        box_top = max(0, min(sma_ys) // sma_scale - SMA_MASK_PADDING)
+        box_right = min(width, max(sma_xs) // sma_scale + SMA_MASK_PADDING + 1)
+        box_bottom = min(height, max(sma_ys) // sma_scale + SMA_MASK_PADDING + 1)
+        box_size = (box_right - box_left, box_bottom - box_top)
+        offset_x, offset_y = box_left * sma_scale, box_top * sma_scale
+        sma_mask = Image.new("L", (box_size[0] * sma_scale, box_size[1] * sma_scale), 0)
+        sma_draw = ImageDraw.Draw(sma_mask)
+        for period, segments in sma_segments.items():
+            if not segments:
+                continue
+            sma_mask.paste(0, (0, 0, *sma_mask.size))
+            for x1, y1, x2, y2 in segments:
+                sma_draw.line(
+                    (x1 - offset_x, y1 - offset_y, x2 - offset_x, y2 - offset_y),
                     fill=255,
                     width=max(1, round(1.25 * sma_scale)),
                 )
-    for period, mask in sma_masks.items():
-        mask = mask.resize((width, height), Image.Resampling.LANCZOS)
-        image.paste(sma_colors[period], (0, 0, width, height), mask)
+            mask = sma_mask.resize(box_size, Image.Resampling.LANCZOS)
+            image.paste(sma_colors[period], (box_left, box_top, box_right, box_bottom), mask)
 
     last_idx = indexes[-1]
     last = all_rows[last_idx]
@@ -1156,14 +1507,6 @@ def render_price_chart_png(quote: dict[str, Any], request: ChartRequest) -> byte
         value = smas[period][last_idx]
         if value is not None:
             draw.text((8, 46 + row * 22), f"SMA {period} · {_fmt(value)}", fill=sma_colors[period], font=sma_font)
-    if period_shell:
-        side_font = font(14)
-        label = request.timeframe_label.upper()
-        label_img = Image.new("RGBA", (220, 42), (0, 0, 0, 0))
-        label_draw = ImageDraw.Draw(label_img)
-        label_draw.text((0, 0), label, fill=text + (255,), font=side_font)
-        label_img = label_img.crop(label_img.getbbox() or (0, 0, 1, 1)).rotate(90, expand=True)
-        image.paste(label_img, (18, price_top + (price_bottom - price_top - label_img.height) // 2), label_img)
 
     last_scaled = scaled(last[4])
     badge_text = _axis_label(last_scaled, request)
@@ -1184,8 +1527,24 @@ def render_price_chart_png(quote: dict[str, Any], request: ChartRequest) -> byte
         y = vol_bottom - round((value / vol_axis_high) * (vol_bottom - vol_top))
         draw.text((6, y - 9), _fmt_volume(value), fill=text, font=small_font)
 
+    return encode_chart_image(image, encoding)
+
+
+def encode_chart_image(image: Any, encoding: str = "optimized") -> bytes:
+    from PIL import Image
+
     output = io.BytesIO()
-    image.save(output, format="PNG", optimize=True)
+    if encoding == "optimized":
+        image.save(output, format="PNG", optimize=True)
+    elif encoding == "fast":
+        image.save(output, format="PNG", compress_level=1)
+    elif encoding == "compact":
+        # Anti-aliasing leaves a few thousand shades; median cut keeps the flat fills exact.
+        image.quantize(256, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE).save(output, format="PNG")
+    elif encoding == "webp":
+        image.save(output, format="WEBP", lossless=True)
+    else:
+        raise ValueError(f"Unknown chart image encoding: {encoding}")
     return output.getvalue()
 
 
@@ -0,0 +1,174 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from charting import ChartSeries
+
+# Total indicator values kept across all series (about 70 bytes each with their running state).
+INDICATOR_MAX_BARS = 250_000
+
+IndicatorValues = list[float | None]
+# step(i, running state after bar i - 1) -> (indicator value at bar i, running state after bar i)
+IndicatorStep = Callable[[int, Any], tuple[float | None, Any]]
+
+
+class _SeriesState:
+    __slots__ = ("columns", "values", "carry", "firsts", "bars")
+
+    def __init__(self, columns: tuple[np.ndarray, ...]) -> None:
+        self.columns = columns
+        # Per indicator: its output so far, the running state after each bar and the first
+        # bar actually computed (earlier bars are None padding).
+        self.values: dict[Hashable, IndicatorValues] = {}
+        self.carry: dict[Hashable, list[Any]] = {}
+        self.firsts: dict[Hashable, int] = {}
+        self.bars = 0
+
+
+def _common_prefix(old: tuple[np.ndarray, ...], new: tuple[np.ndarray, ...]) -> int:
+    count = min(len(old[0]), len(new[0]))
+    same = np.ones(count, dtype=bool)
+    for old_column, new_column in zip(old, new):
+        same &= old_column[:count] == new_column[:count]
+    return count if same.all() else int(np.argmin(same))
+
+
+def _sma_step(closes: np.ndarray, period: int, start: int) -> IndicatorStep:
+    # Only the bars from `start - period` on are needed to step from `start`.
+    offset = max(0, start - period)
+    window = closes[offset:].tolist()
+
+    def step(i: int, total: float | None) -> tuple[float | None, float]:
+        if total is None:
+            # Starting mid-series: seed with the bars the running sum would still hold.
+            total = sum(window[max(0, i - period) - offset:i - offset], 0.0)
+        total += window[i - offset]
+        if i >= period:
+            total -= window[i - period - offset]
+        return (total / period if i >= period - 1 else None), total
+    return step
+
+
+def _ema_step(closes: np.ndarray, period: int, start: int) -> IndicatorStep:
+    alpha = 2.0 / (period + 1)
+    window = closes[start:].tolist()
+
+    def step(i: int, ema: float | None) -> tuple[float | None, float | None]:
+        if i < period - 1:
+            return None, None
+        if ema is None:
+            # Seeded with the SMA of the first full period.
+            ema = sum(closes[:period].tolist()) / period
+        else:
+            ema = window[i - start] * alpha + ema * (1.0 - alpha)
+        return ema, ema
+    return step
+
+
+def _vwap_step(columns: tuple[np.ndarray, ...], start: int) -> IndicatorStep:
+    days, highs, lows, closes, volumes = (column[start:].tolist() for column in columns)
+
+    def step(i: int, state: tuple[int, float, float] | None) -> tuple[float | None, tuple[int, float, float]]:
+        pos = i - start
+        day = days[pos]
+        _, price_volume, volume = state if state is not None and state[0] == day else (day, 0.0, 0.0)
+        price_volume += (highs[pos] + lows[pos] + closes[pos]) / 3.0 * volumes[pos]
+        volume += volumes[pos]
+        return (price_volume / volume if volume > 0 else None), (day, price_volume, volume)
+    return step
+
+
+class IndicatorEngine:
+    # Indicator series per chart key. A new request reuses every bar that matches the previous
+    # one (same epochs and OHLCV) and only steps the indicators over the changed tail, so a
+    # revised in-progress bar or a few new bars cost a few steps instead of a full pass.
+    def __init__(self, max_bars: int = INDICATOR_MAX_BARS) -> None:
+        self.max_bars = max_bars
+        self.reused_bars = 0
+        self.computed_bars = 0
+        self._series: OrderedDict[Hashable, _SeriesState] = OrderedDict()
+        self._bars = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def sma(self, key: Hashable, rows: "ChartSeries", period: int, first: int = 0) -> IndicatorValues:
+        # Bars before `first` come back as None; only `first` on (plus one period of lookback) is read.
+        return self._indicator(key, rows, ("sma", period), lambda start: _sma_step(rows.closes, period, start), first)
+
+    def ema(self, key: Hashable, rows: "ChartSeries", period: int) -> IndicatorValues:
+        return self._indicator(key, rows, ("ema", period), lambda start: _ema_step(rows.closes, period, start))
+
+    def vwap(self, key: Hashable, rows: "ChartSeries", days: np.ndarray) -> IndicatorValues:
+        # Session VWAP: `days` labels each bar's session and the running sums reset when it changes.
+        columns = (days, rows.highs, rows.lows, rows.closes, rows.volumes)
+        return self._indicator(key, rows, ("vwap",), lambda start: _vwap_step(columns, start))
+
+    def _indicator(
+        self,
+        key: Hashable,
+        rows: "ChartSeries",
+        name: Hashable,
+        make_step: Callable[[int], IndicatorStep],
+        first: int = 0,
+    ) -> IndicatorValues:
+        with self._lock:
+            state = self._state(key, rows)
+            values = state.values.get(name, [])
+            carry = state.carry.get(name, [])
+            if state.firsts.get(name, 0) > first:
+                values, carry = [], []
+            reused = len(values)
+            first = min(first, len(rows))
+            if reused < first:
+                values = values + [None] * (first - reused)
+                carry = carry + [None] * (first - reused)
+            if reused <= first:
+                state.firsts[name] = first
+            start = len(values)
+            self.reused_bars += reused
+            if start == len(rows):
+                state.values[name], state.carry[name] = values, carry
+                self._resize(key, state)
+                return values
+            step = make_step(start)
+            running = carry[-1] if carry else None
+            new_values: IndicatorValues = []
+            new_carry: list[Any] = []
+            for i in range(start, len(rows)):
+                value, running = step(i, running)
+                new_values.append(value)
+                new_carry.append(running)
+            self.computed_bars += len(new_values)
+            # Fresh lists, so series handed out earlier never change under their reader.
+            state.values[name] = values = values + new_values
+            state.carry[name] = carry + new_carry
+            self._resize(key, state)
+            return values
+
+    def _state(self, key: Hashable, rows: "ChartSeries") -> _SeriesState:
+        columns = rows.columns()
+        state = self._series.pop(key, None)
+        if state is None:
+            state = _SeriesState(columns)
+        elif any(old is not new for old, new in zip(state.columns, columns)):
+            keep = _common_prefix(state.columns, columns)
+            state.columns = columns
+            for name in state.values:
+                state.values[name] = state.values[name][:keep]
+                state.carry[name] = state.carry[name][:keep]
+        self._series[key] = state
+        return state
+
+    def _resize(self, key: Hashable, state: _SeriesState) -> None:
+        # Recount the series just touched, then drop least recently used ones past the bar budget.
+        bars = sum(map(len, state.values.values()))
+        self._bars += bars - state.bars
+        state.bars = bars
+        while self._bars > self.max_bars and len(self._series) > 1:
+            self._bars -= self._series.pop(next(iter(self._series))).bars
@@ -1,269 +1,6 @@
-import io
-from json import JSONDecodeError
-import os
-import time
-from typing import Any
-
-from charting import (
-    PREFIX,
-    ChartRequest,
-    NoChartData,
-    _has_close_only_latest_ohlc,
-    _patch_close_only_latest_ohlc,
-    _safe_float,
-    _latest_quote_price_time,
-    aggregate_yahoo_chart_data,
-    _stock_previous_close,
-    chart_title,
-    parse_chart_command,
-    quote_description,
-    render_price_chart_png,
-    yahoo_chart_url,
-)
-
-import aiohttp
-import discord
-from dotenv import load_dotenv
-
-
-class MarketDataProviderError(RuntimeError):
-    pass
-
-HELP_TEXT = """**ChartVF**
-
-**Syntax**
-`;TICKER [timeframe] [type] [range] [theme] [scale]` — stocks
-`;fut ROOT [timeframe] [type] [range] [theme] [scale]` — futures
-
-**Examples**
-`;AAPL` → latest 5-minute candle chart
-`;AAPL d` → daily candle chart
-`;AMD 3` → AMD 3-minute intraday chart
-`;QQQ w line` → weekly line chart
-`;LULU 1y` → 1-year chart
-`;AAPL dark log` → dark theme, log scale
-`;fut ES` → E-mini S&P latest 5-minute chart
-`;fut ES 15` → E-mini S&P 15-minute chart
-`;fut CL w line` → crude oil weekly line
-`;futures GC 1y` → gold 1-year chart
-Indexes: `;SPX`, `;NDX`, `;DJX`/`;DJI`/`;DJIA`, `;RUT`, `;RUI`, `;VIX`, `;IXIC`, `;OEX`
-
-**Options** (same for stocks and futures)
-Timeframes: stocks support `d`, `w`, `m`, plus intraday `1`, `2`, `3`, `5`, `15`, `30`, `60`, `4h`; futures also support `10`, `2h`
-Types: `candle`, `line`
-Ranges: `1m`, `3m`, `6m`, `ytd`, `1y`, `2y`, `5y`, `max`
-Themes: `dark`, `light`
-Scales: `linear`, `log`, `percent`
-
-Options can be in any order after the ticker.
-
-**Futures** (`;fut`/`;future`/`;futures`): `;f` is still Ford (`F`).
-
-**Freshness**: bare stock and futures commands default to the latest 5-minute chart. Every
-chart image is rendered locally from market chart data.
-"""
-
-HTTP_TIMEOUT = aiohttp.ClientTimeout(total=12)
-USER_AGENT = (
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-    "AppleWebKit/537.36 (KHTML, like Gecko) "
-    "Chrome/125.0 Safari/537.36"
-)
-
-intents = discord.Intents.default()
-intents.message_content = True
-client = discord.Client(intents=intents)
-NO_MENTIONS = discord.AllowedMentions.none()
-
-
-@client.event
-async def on_ready() -> None:
-    print(f"{client.user} is online")
-
-
-@client.event
-async def on_message(message: discord.Message) -> None:
-    if message.author.bot or not message.content.startswith(PREFIX):
-        return
-
-    command_text = message.content[len(PREFIX):].strip()
-    if not command_text:
-        await message.channel.send(HELP_TEXT, allowed_mentions=NO_MENTIONS)
-        return
-    if command_text.split(maxsplit=1)[0].lower() in {"help", "h"}:
-        await message.channel.send(HELP_TEXT, allowed_mentions=NO_MENTIONS)
-        return
-
-    try:
-        request = parse_chart_command(message.content)
-    except ValueError as error:
-        await message.channel.send(str(error), allowed_mentions=NO_MENTIONS)
-        return
-
-    if request:
-        await send_chart(message.channel, request)
-
-
-async def fetch_daily_previous_close(session: aiohttp.ClientSession, request: ChartRequest) -> float | None:
-    daily_request = ChartRequest(
-        request.ticker,
-        "d",
-        "daily",
-        date_range="m1",
-        date_range_label="1 month",
-        futures=request.futures,
-    )
-    async with session.get(yahoo_chart_url(daily_request), headers={"Accept": "application/json"}) as response:
-        if response.status != 200:
-            return None
-        data = await response.json(content_type=None)
-
-    chart = data.get("chart") or {}
-    results = chart.get("result") or []
-    if not results:
-        return None
-    raw_quote = ((results[0].get("indicators") or {}).get("quote") or [{}])[0]
-    closes = raw_quote.get("close") or []
-    valid_closes = [close for close in (_safe_float(value) for value in closes) if close is not None]
-    return valid_closes[-2] if len(valid_closes) > 1 else None
-
-
-async def fetch_current_day_intraday_quote(session: aiohttp.ClientSession, request: ChartRequest) -> dict[str, Any] | None:
-    intraday_request = ChartRequest(
-        request.ticker,
-        "i1",
-        "1 min",
-        futures=request.futures,
-    )
-    intraday_url = yahoo_chart_url(intraday_request).replace("range=5d", "range=1d").replace(
-        "includePrePost=true",
-        "includePrePost=false",
-    )
-    async with session.get(intraday_url, headers={"Accept": "application/json"}) as response:
-        if response.status != 200:
-            return None
-        data = await response.json(content_type=None)
-
-    chart = data.get("chart") or {}
-    results = chart.get("result") or []
-    if not results:
-        return None
-    result = results[0]
-    raw_quote = ((result.get("indicators") or {}).get("quote") or [{}])[0]
-    return {
-        "ticker": request.ticker,
-        "futures": request.futures,
-        "date": result.get("timestamp") or [],
-        "open": raw_quote.get("open") or [],
-        "high": raw_quote.get("high") or [],
-        "low": raw_quote.get("low") or [],
-        "close": raw_quote.get("close") or [],
-        "volume": raw_quote.get("volume") or [],
-    }
-
-
-async def fetch_market_chart_data(session: aiohttp.ClientSession, request: ChartRequest) -> dict[str, Any]:
-    async with session.get(yahoo_chart_url(request), headers={"Accept": "application/json"}) as response:
-        if response.status == 404:
-            raise NoChartData(f"No chart data found for `{request.ticker}`.")
-        if response.status != 200:
-            raise MarketDataProviderError("Market data provider returned an error")
-        data = await response.json(content_type=None)
-
-    chart = data.get("chart") or {}
-    error = chart.get("error")
-    if error:
-        code = str(error.get("code") if isinstance(error, dict) else error).lower()
-        description = str(error.get("description") if isinstance(error, dict) else "").lower()
-        if "not found" in code or "not found" in description or "no data" in description:
-            raise NoChartData(f"No chart data found for `{request.ticker}`.")
-        raise MarketDataProviderError("Market data provider returned an error")
-    results = chart.get("result") or []
-    if not results:
-        raise NoChartData(f"No chart data found for `{request.ticker}`.")
-
-    result = results[0]
-    meta = result.get("meta") or {}
-    raw_quote = ((result.get("indicators") or {}).get("quote") or [{}])[0]
-    dates = result.get("timestamp") or []
-    closes = raw_quote.get("close") or []
-    last, last_time = _latest_quote_price_time(meta, dates, closes, request)
-    prev = _stock_previous_close(meta, closes, request)
-    if request.timeframe != "d":
-        try:
-            daily_prev = await fetch_daily_previous_close(session, request)
-        except (aiohttp.ClientError, TimeoutError, JSONDecodeError):
-            daily_prev = None
-        if daily_prev is not None:
-            prev = daily_prev
-    change = (last - prev) if last is not None and prev else None
-    quote = {
-        "ticker": request.ticker,
-        "futures": request.futures,
-        "name": meta.get("shortName") or meta.get("longName") or request.ticker,
-        "date": dates,
-        "open": raw_quote.get("open") or [],
-        "high": raw_quote.get("high") or [],
-        "low": raw_quote.get("low") or [],
-        "close": closes,
-        "volume": raw_quote.get("volume") or [],
-        "lastClose": last,
-        "lastTime": last_time,
-        "prevClose": prev,
-        "perfDayUsd": change,
-        "perfDayPct": (change / prev * 100) if change is not None and prev else None,
-    }
-    if request.timeframe == "d" and not request.futures and _has_close_only_latest_ohlc(quote):
-        try:
-            intraday_quote = await fetch_current_day_intraday_quote(session, request)
-        except (aiohttp.ClientError, TimeoutError, JSONDecodeError):
-            intraday_quote = None
-        if intraday_quote is not None:
-            quote = _patch_close_only_latest_ohlc(quote, intraday_quote)
-    return aggregate_yahoo_chart_data(quote, request)
-
-
-async def send_chart(channel: discord.abc.Messageable, request: ChartRequest) -> None:
-    headers = {
-        "User-Agent": USER_AGENT,
-        "Cache-Control": "no-cache",
-    }
-    description = None
-
-    async with channel.typing():
-        try:
-            async with aiohttp.ClientSession(timeout=HTTP_TIMEOUT, headers=headers) as session:
-                quote = await fetch_market_chart_data(session, request)
-                image = render_price_chart_png(quote, request)
-                description = quote_description(quote)
-        except NoChartData as error:
-            await channel.send(str(error), allowed_mentions=NO_MENTIONS)
-            return
-        except (aiohttp.ClientError, TimeoutError, JSONDecodeError, MarketDataProviderError):
-            await channel.send("Market data is temporarily unavailable. Try again in a minute.", allowed_mentions=NO_MENTIONS)
-            return
-
-    filename = f"{request.ticker}_{request.timeframe}_{int(time.time())}.png"
-    file = discord.File(io.BytesIO(image), filename=filename)
-    embed = discord.Embed(
-        title=chart_title(request),
-        description=description,
-        color=0x2ECC71 if (_safe_float(quote.get("perfDayUsd")) or 0.0) >= 0 else 0xFF5252,
-    )
-    embed.set_image(url=f"attachment://{filename}")
-    try:
-        await channel.send(embed=embed, file=file, allowed_mentions=NO_MENTIONS)
-    except discord.HTTPException:
-        await channel.send("Chart rendered, but Discord rejected the image upload.", allowed_mentions=NO_MENTIONS)
-
-
-def main() -> None:
-    load_dotenv()
-    token = os.getenv("DISCORD_TOKEN")
-    if not token:
-        raise SystemExit("Missing DISCORD_TOKEN. Put it in .env or export it.")
-    client.run(token)
-
-
+# Entry point only. Spawned render workers re-import this file as __mp_main__, so the bot
+# (discord, aiohttp, caches) is imported under the guard and never inside a render process.
 if __name__ == "__main__":
+    from bot import main
+
     main()
@@ -0,0 +1,535 @@
+import asyncio
+import datetime as dt
+import json
+import math
+import time
+from array import array
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib decoder is just slower
+    orjson = None
+
+from charting import ChartRequest, ChartSeries, _float_column, _resample_rows, _safe_float
+from market_calendar import (
+    is_trading_session,
+    latest_trading_session,
+    market_reopens_at,
+    previous_trading_session,
+    trading_session_date,
+    trading_session_start,
+)
+
+CHART_CACHE_MAX_ENTRIES = 512
+CHART_IMAGE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+DAILY_BAR_STORE_MAX_SYMBOLS = 2048
+DAILY_BAR_STORE_SESSIONS = 5
+INTRADAY_SERIES_MAX_ENTRIES = 256
+# Tail merges never drop old bars, so rebuild the whole window now and then.
+INTRADAY_SERIES_FULL_REFRESH_SECONDS = 30 * 60
+QUOTE_FIELDS = ("open", "high", "low", "close", "volume")
+CHART_PAYLOAD_MAX_BYTES = 8 * 1024 * 1024
+# The only meta keys anything reads; trading periods, events and adjclose are dropped on decode.
+CHART_META_FIELDS = (
+    "chartPreviousClose",
+    "instrumentType",
+    "longName",
+    "previousClose",
+    "regularMarketPrice",
+    "regularMarketTime",
+    "shortName",
+)
+JsonLoads = Callable[[bytes], Any]
+json_loads: JsonLoads = orjson.loads if orjson is not None else json.loads
+CHART_RANGE_DAYS = {
+    "1d": 1,
+    "5d": 5,
+    "1mo": 31,
+    "3mo": 93,
+    "6mo": 186,
+    "1y": 365,
+    "2y": 730,
+    "5y": 1826,
+    "10y": 3652,
+    "max": math.inf,
+}
+# Yahoo counts these ranges in trading sessions; longer ones reach back calendar days from today.
+CHART_RANGE_SESSIONS = {"5d": 5}
+# Yahoo's `1d` is the last 24 hours, not today's session. Merging a tail onto an older 1d series (or
+# seeding one from disk) would carry the previous session into the current-day quote.
+SESSION_SCOPED_RANGES = {"1d"}
+# Finer Yahoo intervals, best first, that a coarser interval can be rebuilt from. Only edges the
+# bot's own URLs can hit: 30m, 60m and 4h charts span more history than any finer fetch covers.
+DERIVED_INTERVAL_SOURCES = {
+    "2m": ("1m",),
+    "5m": ("1m",),
+    "15m": ("5m", "1m"),
+    "1wk": ("1d",),
+    "1mo": ("1d",),
+}
+CHART_CACHE_DEFAULT_TTL = 60
+# Yahoo instrument types whose bars follow the NYSE or CME Globex calendar; crypto and FX trade on.
+CALENDAR_INSTRUMENT_TYPES = {"EQUITY", "ETF", "FUTURE"}
+# Bars this fine only change every few seconds; daily and slower bars only move the last close.
+CHART_CACHE_TTL_SECONDS = {
+    "1m": 15,
+    "2m": 30,
+    "5m": 60,
+    "15m": 3 * 60,
+    "30m": 5 * 60,
+    "60m": 10 * 60,
+    "4h": 30 * 60,
+    "1d": 60 * 60,
+    "1wk": 3 * 60 * 60,
+    "1mo": 6 * 60 * 60,
+}
+
+
+class TTLCache:
+    def __init__(self, max_entries: int, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[Any, tuple[float, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Any) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Any, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        self._entries.pop(key, None)
+        if len(self._entries) >= self.max_entries:
+            self._evict()
+        self._entries[key] = (self.clock() + ttl, value)
+
+    def peek(self, key: Any) -> Any | None:
+        entry = self._entries.get(key)
+        return entry[1] if entry is not None and entry[0] > self.clock() else None
+
+    def ttl(self, key: Any) -> float:
+        # Seconds until the entry expires; 0 when it is missing or already stale.
+        entry = self._entries.get(key)
+        return max(entry[0] - self.clock(), 0.0) if entry is not None else 0.0
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate), {len(self._entries)} entries"
+
+    def _evict(self) -> None:
+        now = self.clock()
+        for key in [key for key, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+        while len(self._entries) >= self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self.shared = 0
+        self._inflight: dict[Any, asyncio.Future[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: Any, factory: Callable[[], Awaitable[Any]]) -> Any:
+        # Concurrent callers with the same key await one task; its result or error reaches all of them.
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Any, task: asyncio.Future[Any]) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the error retrieved even if every waiter was cancelled first.
+            task.exception()
+
+
+class ByteLRUCache:
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Any, bytes] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Any) -> bytes | None:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Any, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self._entries[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def stats(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate), {self.size:,} bytes"
+
+
+class DailyBarStore:
+    # Recent (session date, close) pairs per symbol, so intraday charts skip the daily fetch for
+    # their previous close until a new session starts.
+    def __init__(self, max_symbols: int = DAILY_BAR_STORE_MAX_SYMBOLS) -> None:
+        self.max_symbols = max_symbols
+        self.hits = 0
+        self.misses = 0
+        self._closes: dict[str, list[tuple[dt.date, float]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._closes)
+
+    def put(self, symbol: str, dates: Any, closes: Any, futures: bool) -> None:
+        self._closes.pop(symbol, None)
+        if len(self._closes) >= self.max_symbols:
+            del self._closes[next(iter(self._closes))]
+        self._closes[symbol] = daily_session_closes(dates, closes, futures)[-DAILY_BAR_STORE_SESSIONS:]
+
+    def previous_close(self, symbol: str, epoch: float, futures: bool) -> float | None:
+        close = previous_session_close(self._closes.get(symbol, []), epoch, futures)
+        if close is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return close
+
+
+class IntradaySeriesStore:
+    def __init__(
+        self,
+        max_entries: int = INTRADAY_SERIES_MAX_ENTRIES,
+        max_age: float = INTRADAY_SERIES_FULL_REFRESH_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.clock = clock
+        self.tail_refreshes = 0
+        self.full_refreshes = 0
+        self._series: dict[Any, tuple[float, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def get(self, key: Any) -> Any | None:
+        entry = self._series.get(key)
+        if entry is None or self.clock() - entry[0] >= self.max_age:
+            return None
+        return entry[1]
+
+    def put(self, key: Any, data: Any, tail: bool = False) -> None:
+        created = self._series[key][0] if tail and key in self._series else self.clock()
+        if tail:
+            self.tail_refreshes += 1
+        else:
+            self.full_refreshes += 1
+        self._series.pop(key, None)
+        if len(self._series) >= self.max_entries:
+            del self._series[next(iter(self._series))]
+        self._series[key] = (created, data)
+
+
+def _chart_result(data: Any) -> dict[str, Any] | None:
+    chart = (data.get("chart") or {}) if isinstance(data, dict) else {}
+    results = chart.get("result") or []
+    if chart.get("error") or not results:
+        return None
+    return results[0]
+
+
+def _chart_column(values: Any, typecode: str) -> Any:
+    # Packed array('q') epochs / array('d') prices: None becomes NaN, odd cells keep the decoded list.
+    if not isinstance(values, list):
+        return values
+    try:
+        column = np.array(values, dtype=np.int64 if typecode == "q" else np.float64)
+    except (TypeError, ValueError, OverflowError):
+        return values
+    return array(typecode, column.tobytes())
+
+
+def decode_chart_json(body: bytes, loads: JsonLoads | None = None) -> Any:
+    data = (loads or json_loads)(body)
+    result = _chart_result(data)
+    if result is None:
+        return data
+    meta = result.get("meta") or {}
+    quote = ((result.get("indicators") or {}).get("quote") or [{}])[0] or {}
+    slim_result = {
+        "meta": {key: meta[key] for key in CHART_META_FIELDS if key in meta},
+        "timestamp": _chart_column(result.get("timestamp") or [], "q"),
+        "indicators": {"quote": [{field: _chart_column(quote.get(field) or [], "d") for field in QUOTE_FIELDS}]},
+    }
+    return {"chart": {"result": [slim_result], "error": None}}
+
+
+def chart_interval_seconds(url: str) -> int | None:
+    interval = dict(parse_qsl(urlsplit(url).query)).get("interval", "")
+    if interval[:-1].isdigit() and interval[-1:] in {"m", "h"}:
+        return int(interval[:-1]) * (60 if interval.endswith("m") else 60 * 60)
+    return None
+
+
+def chart_tail_url(url: str, data: Any, now: float) -> str | None:
+    interval = chart_interval_seconds(url)
+    result = _chart_result(data)
+    dates = (result or {}).get("timestamp") or []
+    parts = urlsplit(url)
+    params = dict(parse_qsl(parts.query))
+    if interval is None or not dates or "range" not in params or params["range"] in SESSION_SCOPED_RANGES:
+        return None
+    # Start one bar before the in-progress bar so a revised last complete bar is picked up too.
+    period1 = (int(dates[-1]) // interval - 1) * interval
+    del params["range"]
+    params["period1"] = str(period1)
+    params["period2"] = str(int(now))
+    return parts._replace(query=urlencode(params)).geturl()
+
+
+def chart_window_start(window: str, now: float, futures: bool) -> float | None:
+    # Epoch of the first session a `range=` window covers, so stored bars are cut on session boundaries.
+    days = CHART_RANGE_DAYS.get(window)
+    if days is None or math.isinf(days) or window in SESSION_SCOPED_RANGES:
+        return None
+    day = trading_session_date(now, futures)
+    if window in CHART_RANGE_SESSIONS:
+        while not is_trading_session(day, futures):
+            day -= dt.timedelta(days=1)
+        for _ in range(CHART_RANGE_SESSIONS[window] - 1):
+            day -= dt.timedelta(days=1)
+            while not is_trading_session(day, futures):
+                day -= dt.timedelta(days=1)
+    else:
+        day -= dt.timedelta(days=days)
+        while not is_trading_session(day, futures):
+            day += dt.timedelta(days=1)
+    return trading_session_start(day, futures)
+
+
+def chart_bar_columns(data: Any) -> dict[str, list[Any]] | None:
+    result = _chart_result(data)
+    dates = (result or {}).get("timestamp") or []
+    if result is None or not dates:
+        return None
+    quote = ((result.get("indicators") or {}).get("quote") or [{}])[0]
+    columns: dict[str, list[Any]] = {"date": [int(epoch) for epoch in dates]}
+    for field in QUOTE_FIELDS:
+        values = list(quote.get(field) or [])
+        columns[field] = values[:len(dates)] + [None] * (len(dates) - len(values))
+    return columns
+
+
+def merge_chart_tail(data: Any, tail: Any) -> dict[str, Any] | None:
+    result = _chart_result(data)
+    tail_result = _chart_result(tail)
+    if result is None or tail_result is None:
+        return None
+    dates = result.get("timestamp") or []
+    tail_dates = tail_result.get("timestamp") or []
+    quote = ((result.get("indicators") or {}).get("quote") or [{}])[0]
+    tail_quote = ((tail_result.get("indicators") or {}).get("quote") or [{}])[0]
+    # The tail replaces every stored bar from its first epoch on, including Yahoo's live quote row.
+    keep = len(dates)
+    if tail_dates:
+        first_tail = int(tail_dates[0])
+        while keep and int(dates[keep - 1]) >= first_tail:
+            keep -= 1
+    merged_quote: dict[str, list[Any]] = {}
+    for field in QUOTE_FIELDS:
+        values = list(quote.get(field) or [])
+        values += [None] * (len(dates) - len(values))
+        tail_values = list(tail_quote.get(field) or [])
+        tail_values += [None] * (len(tail_dates) - len(tail_values))
+        merged_quote[field] = values[:keep] + tail_values[:len(tail_dates)]
+    meta = dict(tail_result.get("meta") or {})
+    base_meta = result.get("meta") or {}
+    # Tail requests report the close before period1; the chart window's previous closes still apply.
+    for key in ("chartPreviousClose", "previousClose"):
+        if key in base_meta:
+            meta[key] = base_meta[key]
+        else:
+            meta.pop(key, None)
+    merged_result = {
+        "meta": meta,
+        "timestamp": list(dates[:keep]) + list(tail_dates),
+        "indicators": {"quote": [merged_quote]},
+    }
+    return {"chart": {"result": [merged_result], "error": None}}
+
+
+def daily_session_closes(dates: Any, closes: Any, futures: bool) -> list[tuple[dt.date, float]]:
+    # Each daily bar with a close, tagged with the session its timestamp falls in, oldest first.
+    sessions: list[tuple[dt.date, float]] = []
+    for epoch, value in zip(dates, closes):
+        close = _safe_float(value)
+        if close is not None:
+            sessions.append((trading_session_date(int(epoch), futures), close))
+    return sessions
+
+
+def previous_session_close(sessions: list[tuple[dt.date, float]], epoch: float, futures: bool) -> float | None:
+    # Close of the session before the latest one, read by date rather than position: a payload
+    # fetched before the open has no bar for today yet. None unless that session is present.
+    current = latest_trading_session(epoch, futures)
+    previous = previous_trading_session(current, futures)
+    for day, close in reversed(sessions):
+        if day < current:
+            return close if day == previous else None
+    return None
+
+
+def chart_image_key(quote: dict[str, Any], request: ChartRequest) -> tuple[Any, ...]:
+    dates = quote.get("date") or []
+    closes = quote.get("close") or []
+    return (
+        request,
+        dates[-1] if len(dates) else None,
+        _safe_float(closes[-1]) if len(closes) else None,
+        quote.get("lastClose"),
+        quote.get("prevClose"),
+    )
+
+
+def chart_cache_key(url: str) -> tuple[str, ...]:
+    parts = urlsplit(url)
+    params = dict(parse_qsl(parts.query))
+    # Monthly URLs carry period2=now, so key them by their open-ended window instead.
+    window = params.get("range") or f"{params.get('period1', '')}-"
+    return (
+        parts.path.rsplit("/", 1)[-1],
+        params.get("interval", ""),
+        window,
+        params.get("includePrePost", ""),
+        params.get("events", ""),
+    )
+
+
+def chart_cache_ttl(url: str, data: Any = None, now: float | None = None) -> float:
+    interval = dict(parse_qsl(urlsplit(url).query)).get("interval", "")
+    ttl = CHART_CACHE_TTL_SECONDS.get(interval, CHART_CACHE_DEFAULT_TTL)
+    result = _chart_result(data)
+    instrument = (result.get("meta") or {}).get("instrumentType") if result is not None else None
+    if instrument not in CALENDAR_INSTRUMENT_TYPES:
+        return ttl
+    # Nothing trades until the next open, so hold closed-market data until then.
+    now = time.time() if now is None else now
+    reopens = market_reopens_at(now, instrument == "FUTURE")
+    return ttl if reopens is None else max(ttl, reopens - now)
+
+
+def _window_days(window: str) -> float | None:
+    # Open-ended period1 windows (monthly charts) start at the first bar, like `max`.
+    return math.inf if window.endswith("-") else CHART_RANGE_DAYS.get(window)
+
+
+def derived_chart_sources(key: tuple[str, ...]) -> list[tuple[str, ...]]:
+    symbol, interval, window, prepost, events = key
+    needed = _window_days(window)
+    if needed is None:
+        return []
+    return [
+        (symbol, source_interval, source_window, prepost, events)
+        for source_interval in DERIVED_INTERVAL_SOURCES.get(interval, ())
+        for source_window, days in CHART_RANGE_DAYS.items()
+        if days >= needed
+    ]
+
+
+def _derived_buckets(dates: np.ndarray, interval: str) -> tuple[np.ndarray, np.ndarray]:
+    # Bucket keys plus the epoch each derived bar is stamped with. Weekly and monthly bars keep
+    # the first source epoch (the session open); intraday bars sit on the UTC interval boundary.
+    if interval in {"1wk", "1mo"}:
+        if interval == "1wk":
+            keys = (dates // 86400 + 3) // 7  # ISO weeks: epoch day 0 was a Thursday
+        else:
+            keys = dates.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+        starts = np.concatenate(([True], keys[1:] != keys[:-1]))
+        return keys, dates[starts][np.cumsum(starts) - 1]
+    seconds = int(interval[:-1]) * 60
+    keys = dates // seconds * seconds
+    return keys, keys
+
+
+def derive_chart_data(data: Any, interval: str) -> dict[str, Any] | None:
+    result = _chart_result(data)
+    if result is None:
+        return None
+    dates = result.get("timestamp")
+    dates = [] if dates is None else dates
+    quote = ((result.get("indicators") or {}).get("quote") or [{}])[0]
+    columns = [[] if quote.get(field) is None else quote[field] for field in QUOTE_FIELDS]
+    count = min(map(len, [dates, *columns[:4]]))
+    o, h, l, c = (_float_column(values, count) for values in columns[:4])
+    v = np.zeros(count, dtype=np.float64)
+    v[:min(count, len(columns[4]))] = _float_column(columns[4], count)
+    keep = ~(np.isnan(o) | np.isnan(h) | np.isnan(l) | np.isnan(c))
+    if not keep.any():
+        return None
+    epochs = np.asarray(dates[:count], dtype=np.int64)[keep]
+    rows = ChartSeries(epochs, o[keep], h[keep], l[keep], c[keep], np.nan_to_num(v[keep]))
+    rows = _resample_rows(rows, *_derived_buckets(epochs, interval))
+    derived_quote = {
+        field: column.tolist()
+        for field, column in zip(QUOTE_FIELDS, (rows.opens, rows.highs, rows.lows, rows.closes, rows.volumes))
+    }
+    derived_result = {
+        "meta": dict(result.get("meta") or {}),
+        "timestamp": rows.dates.tolist(),
+        "indicators": {"quote": [derived_quote]},
+    }
+    return {"chart": {"result": [derived_result], "error": None}}
+
+
+def derive_cached_chart(cache: TTLCache, key: tuple[str, ...]) -> dict[str, Any] | None:
+    for source_key in derived_chart_sources(key):
+        source = cache.peek(source_key)
+        if source is not None:
+            derived = derive_chart_data(source, key[1])
+            if derived is not None:
+                # The derived bars go stale with their source, so they share its remaining TTL.
+                cache.set(key, derived, cache.ttl(source_key))
+                return derived
+    return None
@@ -0,0 +1,163 @@
+import datetime as dt
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+MARKET_TIME_ZONE = ZoneInfo("America/New_York")
+STOCK_5M_START = dt.time(4, 0)
+STOCK_5M_END = dt.time(20, 0)
+REGULAR_SESSION_START = dt.time(9, 30)
+REGULAR_SESSION_END = dt.time(16, 0)
+EARLY_CLOSE_END = dt.time(13, 0)
+EARLY_CLOSE_EXTENDED_END = dt.time(17, 0)
+GLOBEX_HALT_START = dt.time(17, 0)
+GLOBEX_HALT_END = dt.time(18, 0)
+# Yahoo keeps revising the last bars for a few minutes after trading stops.
+MARKET_CLOSE_SETTLE_SECONDS = 10 * 60
+# CME Globex only stays shut all day on these (month, day) holidays.
+GLOBEX_HOLIDAYS = {(1, 1), (12, 25)}
+
+
+def _easter(year: int) -> dt.date:
+    # Anonymous Gregorian computus.
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return dt.date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> dt.date:
+    first = dt.date(year, month, 1)
+    return first + dt.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def _last_weekday(year: int, month: int, weekday: int) -> dt.date:
+    last = dt.date(year + month // 12, month % 12 + 1, 1) - dt.timedelta(days=1)
+    return last - dt.timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day: dt.date) -> dt.date:
+    if day.weekday() == 5:
+        return day - dt.timedelta(days=1)
+    if day.weekday() == 6:
+        return day + dt.timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def nyse_holidays(year: int) -> frozenset[dt.date]:
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),
+        _nth_weekday(year, 2, 0, 3),
+        _easter(year) - dt.timedelta(days=2),
+        _last_weekday(year, 5, 0),
+        _observed(dt.date(year, 7, 4)),
+        _nth_weekday(year, 9, 0, 1),
+        _nth_weekday(year, 11, 3, 4),
+        _observed(dt.date(year, 12, 25)),
+    }
+    # A Saturday New Year's Day is not moved back into the old year.
+    if dt.date(year, 1, 1).weekday() != 5:
+        holidays.add(_observed(dt.date(year, 1, 1)))
+    if year >= 2022:
+        holidays.add(_observed(dt.date(year, 6, 19)))
+    return frozenset(holidays)
+
+
+@lru_cache(maxsize=None)
+def nyse_early_closes(year: int) -> frozenset[dt.date]:
+    candidates = (dt.date(year, 7, 3), _nth_weekday(year, 11, 3, 4) + dt.timedelta(days=1), dt.date(year, 12, 24))
+    return frozenset(day for day in candidates if is_nyse_trading_day(day))
+
+
+def is_nyse_trading_day(day: dt.date) -> bool:
+    return day.weekday() < 5 and day not in nyse_holidays(day.year)
+
+
+def _stock_market_open(local: dt.datetime) -> bool:
+    if not is_nyse_trading_day(local.date()):
+        return False
+    end = EARLY_CLOSE_EXTENDED_END if local.date() in nyse_early_closes(local.year) else STOCK_5M_END
+    return STOCK_5M_START <= local.time() <= end
+
+
+def _globex_trade_date(local: dt.datetime) -> dt.date | None:
+    # A Globex session opens at 18:00 ET and trades for the next calendar day until 17:00 ET.
+    if GLOBEX_HALT_START <= local.time() < GLOBEX_HALT_END:
+        return None
+    return local.date() + dt.timedelta(days=1) if local.time() >= GLOBEX_HALT_END else local.date()
+
+
+def _is_globex_trade_date(day: dt.date) -> bool:
+    return day.weekday() < 5 and (day.month, day.day) not in GLOBEX_HOLIDAYS
+
+
+def _globex_market_open(local: dt.datetime) -> bool:
+    trade_date = _globex_trade_date(local)
+    return trade_date is not None and _is_globex_trade_date(trade_date)
+
+
+def market_is_open(epoch: float, futures: bool) -> bool:
+    local = dt.datetime.fromtimestamp(epoch, MARKET_TIME_ZONE)
+    return _globex_market_open(local) if futures else _stock_market_open(local)
+
+
+def next_market_open(epoch: float, futures: bool) -> float:
+    # Stock data starts moving with the 4:00 ET pre-market; Globex reopens at 18:00 ET.
+    day = dt.datetime.fromtimestamp(epoch, MARKET_TIME_ZONE).date()
+    while True:
+        if futures:
+            opens = dt.datetime.combine(day, GLOBEX_HALT_END, MARKET_TIME_ZONE)
+            valid = _is_globex_trade_date(day + dt.timedelta(days=1))
+        else:
+            opens = dt.datetime.combine(day, STOCK_5M_START, MARKET_TIME_ZONE)
+            valid = is_nyse_trading_day(day)
+        if valid and opens.timestamp() > epoch:
+            return opens.timestamp()
+        day += dt.timedelta(days=1)
+
+
+def market_reopens_at(epoch: float, futures: bool) -> float | None:
+    # Epoch at which a closed, settled market next trades; None while data can still change.
+    if market_is_open(epoch, futures) or market_is_open(epoch - MARKET_CLOSE_SETTLE_SECONDS, futures):
+        return None
+    return next_market_open(epoch, futures)
+
+
+def trading_session_date(epoch: float, futures: bool) -> dt.date:
+    # Stock sessions carry their New York date; a Globex session opening at 18:00 ET trades for the next day.
+    local = dt.datetime.fromtimestamp(epoch, MARKET_TIME_ZONE)
+    if futures and local.time() >= GLOBEX_HALT_END:
+        return local.date() + dt.timedelta(days=1)
+    return local.date()
+
+
+def is_trading_session(day: dt.date, futures: bool) -> bool:
+    return _is_globex_trade_date(day) if futures else is_nyse_trading_day(day)
+
+
+def trading_session_start(day: dt.date, futures: bool) -> float:
+    # First epoch that belongs to the session: New York midnight, or the 18:00 ET Globex open the evening before.
+    if futures:
+        return dt.datetime.combine(day - dt.timedelta(days=1), GLOBEX_HALT_END, MARKET_TIME_ZONE).timestamp()
+    return dt.datetime.combine(day, dt.time(0), MARKET_TIME_ZONE).timestamp()
+
+
+def previous_trading_session(day: dt.date, futures: bool) -> dt.date:
+    day -= dt.timedelta(days=1)
+    while not is_trading_session(day, futures):
+        day -= dt.timedelta(days=1)
+    return day
+
+
+def latest_trading_session(epoch: float, futures: bool) -> dt.date:
+    # The last session that has started. Stock sessions start with the 4:00 ET pre-market, so
+    # overnight hours, weekends and holidays still point at the last trading day.
+    day = trading_session_date(epoch, futures)
+    if not futures and dt.datetime.fromtimestamp(epoch, MARKET_TIME_ZONE).time() < STOCK_5M_START:
+        day -= dt.timedelta(days=1)
+    return day if is_trading_session(day, futures) else previous_trading_session(day, futures)
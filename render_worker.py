@@ -0,0 +1,16 @@
+from typing import Any
+
+from charting import CHART_FONTS, ChartRequest, chart_font, render_price_chart_png
+
+
+# Everything a render process runs. Workers import this module and charting only, never the bot.
+def warm_chart_renderer() -> None:
+    # Render pool initializer: import Pillow and load every chart font before the first request.
+    from PIL import Image, ImageDraw  # noqa: F401
+
+    for face, size in CHART_FONTS:
+        chart_font(face, size)
+
+
+def render_chart_image(quote: dict[str, Any], request: ChartRequest, encoding: str, raster: str) -> bytes:
+    return render_price_chart_png(quote, request, encoding, raster)
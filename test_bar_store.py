@@ -0,0 +1,78 @@
+import math
+import tempfile
+
+import numpy as np
+
+from bar_store import BarStore, _column_path, stored_chart_data
+
+
+def test_bar_store_regressions() -> None:
+    """Run lightweight assert-based regression checks."""
+    def bars(dates: list[int], closes: list[float | None]) -> dict[str, list[object]]:
+        return {
+            "date": dates,
+            "open": list(closes),
+            "high": list(closes),
+            "low": list(closes),
+            "close": list(closes),
+            "volume": [100.0] * len(dates),
+        }
+
+    with tempfile.TemporaryDirectory() as root:
+        store = BarStore(root, max_bars=6)
+        assert store.read("AMD", "5m", "5d", "true") is None
+        store.append("AMD", "5m", "5d", "true", bars([0, 300, 600, 615], [1.0, None, 3.0, 3.5]), {"previousClose": 0.5})
+        columns = store.read("AMD", "5m", "5d", "true")
+        assert columns is not None and columns["date"].tolist() == [0, 300, 600, 615]
+        assert columns["close"][0] == 1.0 and math.isnan(columns["close"][1]) and columns["close"][3] == 3.5
+        # The live 615 row is superseded by the refreshed 600 bar and the new bars after it.
+        store.append("AMD", "5m", "5d", "true", bars([0, 300, 600, 900], [1.0, 2.0, 3.2, 4.0]))
+        columns = store.read("AMD", "5m", "5d", "true")
+        assert columns is not None and columns["date"].tolist() == [0, 300, 600, 900]
+        assert columns["close"][2:].tolist() == [3.2, 4.0] and math.isnan(columns["close"][1])
+        series = store.path("AMD", "5m", "5d", "true")
+        assert _column_path(series, "date").stat().st_size == 6 * 8
+        assert _column_path(series, "close").stat().st_size == 6 * 8
+        assert store.read_meta("AMD", "5m", "5d", "true") == {"previousClose": 0.5}
+        assert store.read("AMD", "5m", "1mo", "true") is None and store.read_meta("AMD", "5m", "1mo", "true") == {}
+        assert store.read("^GSPC", "5m", "5d", "true") is None and "^" not in store.path("^GSPC", "5m", "5d", "true").name
+
+        # A torn write left the epoch column one bar longer; the next batch still lines up.
+        with open(_column_path(series, "date"), "ab") as file:
+            file.write(np.array([1200], dtype="<i8").tobytes())
+        torn = BarStore(root, max_bars=6)
+        torn.append("AMD", "5m", "5d", "true", bars([900, 1200], [4.1, 5.0]))
+        columns = torn.read("AMD", "5m", "5d", "true")
+        assert columns is not None and columns["date"].tolist() == [0, 300, 600, 900, 1200]
+        assert columns["close"][-2:].tolist() == [4.1, 5.0]
+
+        fresh = BarStore(root, max_bars=6)
+        for step in range(4):
+            dates = [300 * i for i in range(step + 5, step + 8)]
+            fresh.append("AMD", "5m", "5d", "true", bars(dates, [float(i) for i in range(3)]))
+        columns = fresh.read("AMD", "5m", "5d", "true")
+        assert columns is not None and columns["date"].tolist() == [300 * i for i in range(5, 11)]
+        assert _column_path(series, "date").stat().st_size <= 2 * 6 * 8
+        assert fresh.read_meta("AMD", "5m", "5d", "true") == {"previousClose": 0.5}
+
+        capped = BarStore(root, max_bytes=6 * 8 * 8)
+        capped.append("SPY", "1m", "5d", "true", bars([60 * i for i in range(4)], [1.0] * 4))
+        assert capped.read("AMD", "5m", "5d", "true") is None and capped.read("SPY", "1m", "5d", "true") is not None
+        assert capped.read_meta("AMD", "5m", "5d", "true") == {}
+
+    columns = {field: np.asarray(values) for field, values in bars([1_000, 2_000, 3_000], [1.0, 2.0, 3.0]).items()}
+    assert stored_chart_data(None, 0) is None
+    # Stale: the last stored bar ends before the window's first session.
+    assert stored_chart_data(columns, 100_000) is None
+    # Short: the stored bars start a full day after the window's first session.
+    assert stored_chart_data(columns, -90_000) is None
+    stored = stored_chart_data(columns, 1_500, meta={"chartPreviousClose": 0.9})
+    assert stored is not None
+    assert stored["chart"]["result"][0]["timestamp"] == [2_000, 3_000]
+    assert stored["chart"]["result"][0]["indicators"]["quote"][0]["close"] == [2.0, 3.0]
+    assert stored["chart"]["result"][0]["meta"] == {"chartPreviousClose": 0.9}
+
+
+if __name__ == "__main__":
+    test_bar_store_regressions()
+    print("test_bar_store ok")
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+import aiohttp
+
+import bot
+from bar_store import BarStore
+from charting import ChartRequest, yahoo_chart_url
+from market_cache import IntradaySeriesStore, chart_cache_key
+
+
+class _Content:
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+
+    async def iter_chunked(self, size: int) -> Any:
+        for start in range(0, len(self.body), size):
+            yield self.body[start:start + size]
+
+
+class _Response:
+    def __init__(self, body: bytes) -> None:
+        self.status = 200
+        self.content = _Content(body)
+        self.content_length = len(body)
+
+    async def __aenter__(self) -> "_Response":
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+
+class _Typing:
+    async def __aenter__(self) -> None:
+        return None
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+
+class _Channel:
+    def __init__(self) -> None:
+        self.sent: list[str] = []
+
+    def typing(self) -> _Typing:
+        return _Typing()
+
+    async def send(self, content: str, **kwargs: Any) -> None:
+        self.sent.append(content)
+
+
+class _Session:
+    # Serves one payload for every URL; with fail_tail, tail refreshes (period1=...) fail like a
+    # dropped connection.
+    def __init__(self, payload: dict[str, Any], fail_tail: bool = False) -> None:
+        self.body = json.dumps(payload).encode()
+        self.fail_tail = fail_tail
+        self.urls: list[str] = []
+
+    def get(self, url: str, headers: dict[str, str] | None = None) -> _Response:
+        self.urls.append(url)
+        if self.fail_tail and "period1=" in url:
+            raise aiohttp.ClientConnectionError("tail refresh dropped")
+        return _Response(self.body)
+
+
+def test_bot_regressions() -> None:
+    """Run lightweight assert-based regression checks."""
+    now = int(time.time()) // 300 * 300
+    dates = [now - 300 * (40 - i) for i in range(40)]
+    payload = {"chart": {"result": [{
+        "meta": {"chartPreviousClose": 9.5},
+        "timestamp": dates,
+        "indicators": {"quote": [{
+            "open": [10.0] * 40, "high": [11.0] * 40, "low": [9.0] * 40, "close": [10.5] * 40, "volume": [100] * 40,
+        }]},
+    }], "error": None}}
+    url = yahoo_chart_url(ChartRequest("AMD", "i5", "5 min"))
+    key = chart_cache_key(url)
+    saved = bot._bar_store, bot.intraday_series_store, bot.bar_store_seeded
+    with tempfile.TemporaryDirectory() as root:
+        try:
+            bot._bar_store, bot.intraday_series_store = BarStore(root), IntradaySeriesStore()
+            bot.intraday_series_store.put(key, payload)
+            session = _Session(payload, fail_tail=True)
+            status, data = asyncio.run(bot._download_chart_json(session, url, key))  # type: ignore[arg-type]
+        finally:
+            bot._bar_store, bot.intraday_series_store, bot.bar_store_seeded = saved
+            bot.chart_response_cache.clear()
+    assert status == 200 and list(data["chart"]["result"][0]["timestamp"]) == dates
+    assert len(session.urls) == 2 and "period1=" in session.urls[0] and session.urls[1] == url
+
+    # Disk bars seed a series once per process; after the in-memory series ages out, the next
+    # request is a real full download even though the file still covers the window.
+    history = [now - 300 * (3600 - i) for i in range(3600)]
+    bars = {"date": history, **{field: [10.0] * len(history) for field in ("open", "high", "low", "close", "volume")}}
+    saved = bot._bar_store, bot.intraday_series_store, bot.bar_store_seeded
+    with tempfile.TemporaryDirectory() as root:
+        try:
+            bot._bar_store = BarStore(root)
+            bot._bar_store.append(key[0], key[1], key[2], key[3], bars, {"previousClose": 9.0})
+            bot.intraday_series_store, bot.bar_store_seeded = IntradaySeriesStore(), set()
+            session = _Session(payload)
+            asyncio.run(bot._download_chart_json(session, url, key))  # type: ignore[arg-type]
+            assert len(session.urls) == 1 and "period1=" in session.urls[0]
+            bot.intraday_series_store = IntradaySeriesStore()
+            asyncio.run(bot._download_chart_json(session, url, key))  # type: ignore[arg-type]
+            assert session.urls[1:] == [url]
+        finally:
+            bot._bar_store, bot.intraday_series_store, bot.bar_store_seeded = saved
+            bot.chart_response_cache.clear()
+
+    # A daily chart whose latest bar has full OHLC never asks for the 1-minute current-day quote.
+    day = 86400
+    daily = {"chart": {"result": [{
+        "meta": {"previousClose": 9.0},
+        "timestamp": [now - day * (30 - i) for i in range(30)],
+        "indicators": {"quote": [{
+            "open": [10.0] * 30, "high": [11.0] * 30, "low": [9.0] * 30, "close": [10.5] * 30, "volume": [100] * 30,
+        }]},
+    }], "error": None}}
+    session = _Session(daily)
+    try:
+        quote = asyncio.run(bot.fetch_market_chart_data(session, ChartRequest("AMD", "d", "daily")))  # type: ignore[arg-type]
+    finally:
+        bot.chart_response_cache.clear()
+    assert quote["close"][-1] == 10.5
+    assert len(session.urls) == 1 and "interval=1d" in session.urls[0]
+
+
+    # A broken render pool is replaced and the render retried once; a second failure gets a reply.
+    calls: list[int] = []
+
+    async def flaky_render(quote: dict[str, Any], request: ChartRequest) -> bytes:
+        calls.append(len(calls))
+        if len(calls) == 1:
+            raise BrokenProcessPool("worker died")
+        return b"png"
+
+    async def broken_build(request: ChartRequest) -> tuple[dict[str, Any], bytes]:
+        raise BrokenProcessPool("worker died")
+
+    channel = _Channel()
+    saved_render, saved_build = bot._render_in_pool, bot.build_chart
+    try:
+        bot._render_in_pool = flaky_render  # type: ignore[assignment]
+        assert asyncio.run(bot.render_chart({}, ChartRequest("AMD"))) == b"png" and len(calls) == 2
+        bot.build_chart = broken_build  # type: ignore[assignment]
+        asyncio.run(bot.send_chart(channel, ChartRequest("AMD")))  # type: ignore[arg-type]
+    finally:
+        bot._render_in_pool, bot.build_chart = saved_render, saved_build
+    assert channel.sent == ["Chart rendering is temporarily unavailable. Try again in a minute."]
+
+    saved_workers = os.environ.get("RENDER_WORKERS")
+    os.environ["RENDER_WORKERS"] = "four"
+    try:
+        bot.render_pool()
+    except SystemExit as error:
+        assert "RENDER_WORKERS" in str(error)
+    else:
+        raise AssertionError("RENDER_WORKERS=four was accepted")
+    finally:
+        if saved_workers is None:
+            del os.environ["RENDER_WORKERS"]
+        else:
+            os.environ["RENDER_WORKERS"] = saved_workers
+    assert bot._render_pool is None
+    saved_raster = os.environ.get("CHART_RASTER")
+    os.environ["CHART_RASTER"] = "ARRAY"
+    try:
+        assert bot.chart_raster() == "array"
+        os.environ["CHART_RASTER"] = "numpy"
+        bot.chart_raster()
+    except SystemExit as error:
+        assert "CHART_RASTER" in str(error)
+    else:
+        raise AssertionError("CHART_RASTER=numpy was accepted")
+    finally:
+        if saved_raster is None:
+            del os.environ["CHART_RASTER"]
+        else:
+            os.environ["CHART_RASTER"] = saved_raster
+
+
+if __name__ == "__main__":
+    test_bot_regressions()
+    print("test_bot ok")
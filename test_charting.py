@@ -4,12 +4,16 @@ import math
 
 from charting import (
     CHART_RIGHT_MARGIN,
+    CHART_ROW_STAGES,
     DEFAULT_HEIGHT,
     DEFAULT_SCALE_FACTOR,
     DEFAULT_WIDTH,
     FUTURES_INTRADAY_VISIBLE_BARS,
     MARKET_TIME_ZONE,
     NoChartData,
+    SESSION_AFTER,
+    SESSION_PRE,
+    SESSION_REGULAR,
     SMA_COLORS,
     SMA_PERIODS,
     SPARSE_CHART_MIN_BARS,
@@ -19,10 +23,12 @@ from charting import (
     STOCK_WEEKLY_VISIBLE_BARS,
     YAHOO_SYMBOL_ALIASES,
     ChartRequest,
+    ChartSeries,
     _blend_rgb,
     _chart_x_positions,
     _clean_futures_intraday_wicks,
     _clean_stock_extended_wicks,
+    _dash_mask,
     _date_label,
     _futures_globex_session_bands,
     _futures_globex_session_key,
@@ -42,7 +48,10 @@ from charting import (
     _volume_scale_value,
     _x_grid_line_styles,
     aggregate_yahoo_chart_data,
+    chart_font,
     chart_title,
+    encode_chart_image,
+    indicator_engine,
     parse_chart_command,
     quote_description,
     render_price_chart_png,
@@ -52,6 +61,9 @@ from charting import (
 
 def test_charting_regressions() -> None:
     """Run lightweight assert-based regression checks."""
+    assert list(_dash_mask(14, 8, 6, False).tobytes()) == [255] * 9 + [0] * 6
+    assert list(_dash_mask(16, 8, 6, True).tobytes()) == [255] * 9 + [0] * 5 + [255] * 3
+    assert chart_font("sans", 18) is chart_font("sans", 18) and chart_font("date", 11) is chart_font("date", 11)
     assert parse_chart_command("hello") is None
     assert parse_chart_command(";") is None
     assert parse_chart_command(";help") is None
@@ -84,6 +96,15 @@ def test_charting_regressions() -> None:
         "lastClose": 12.5,
     }, ChartRequest("AMD", "d", "daily"))
     assert pending_rows[-1][4] == 12.5
+    messy_rows = _quote_rows({
+        "date": [1, 2, 3, 4],
+        "open": ["10", None, 11, float("inf")],
+        "high": [12, 13, "bad", 14],
+        "low": [9, 10, 10, 12],
+        "close": [10.5, 11, 12, 13],
+        "volume": [None, 120],
+    }, ChartRequest("AMD", "d", "daily"))
+    assert list(messy_rows) == [(1, 10.0, 12.0, 9.0, 10.5, 0.0)]
     bad_vix_daily = {
         "date": [1, 2],
         "open": [19.67, 0.0],
@@ -118,6 +139,14 @@ def test_charting_regressions() -> None:
         (utc_epoch(2026, 1, 15), 10.0, 15.0, 8.0, 14.0, 180.0),
         (utc_epoch(2026, 2, 1), 20.0, 22.0, 19.0, 21.0, 120.0),
     ]
+    monthly_quote = {
+        "date": [utc_epoch(2026, 1, 1), utc_epoch(2026, 1, 15), utc_epoch(2026, 2, 1)],
+        "open": [10, 11, 20], "high": [12, 15, 22], "low": [9, 8, 19], "close": [11, 14, 21], "volume": [100, 80, 120],
+    }
+    stage_timings: dict[str, float] = {}
+    assert _quote_rows(monthly_quote, ChartRequest("AMD", "m", "monthly"), CHART_ROW_STAGES, timings=stage_timings) == monthly_rows
+    assert set(stage_timings) == {"parse", *(name for name, _ in CHART_ROW_STAGES)}
+    assert len(_quote_rows(monthly_quote, ChartRequest("AMD", "m", "monthly"), skip={"monthly"})) == 3
     assert parse_chart_command(";amd 1") == ChartRequest("AMD", "i1", "1 min")
     assert parse_chart_command(";amd 3") == ChartRequest("AMD", "i3", "3 min")
     assert parse_chart_command(";amd 4h") == ChartRequest("AMD", "h4", "4 hour")
@@ -149,6 +178,9 @@ def test_charting_regressions() -> None:
     assert len(_visible_indexes(sample_rows + sample_rows, ChartRequest("AMD", "d", "daily"))) == STOCK_DAILY_VISIBLE_BARS
     assert len(_visible_indexes(sample_rows, ChartRequest("AMD", "w", "weekly"))) == STOCK_WEEKLY_VISIBLE_BARS
     assert len(_visible_indexes(sample_rows, ChartRequest("AMD", "m", "monthly"))) == STOCK_MONTHLY_VISIBLE_BARS
+    daily_rows = [(utc_epoch(2024, 1, 1) + day * 86400, 1.0, 1.0, 1.0, 1.0, 1.0) for day in range(800)]
+    assert _visible_indexes(daily_rows, ChartRequest("AMD", "d", "daily", date_range="y1")) == range(434, 800)
+    assert _visible_indexes(daily_rows, ChartRequest("AMD", "d", "daily", date_range="max")) == range(800)
     assert _nice_linear_axis(14.92, 32.73) == (14, 34, [34, 32, 30, 28, 26, 24, 22, 20, 18, 16, 14])
     assert _month_tick_label(utc_epoch(2024, 1, 1), 1_000 * 86400) == "24"
     assert _month_tick_label(utc_epoch(2024, 2, 1), 1_000 * 86400) == "F"
@@ -215,6 +247,19 @@ def test_charting_regressions() -> None:
         (10, 15, "globex"),
         (25, 40, "globex"),
     ]
+    dst_epochs = [
+        int(dt.datetime(2026, 3, 6, 9, 30, tzinfo=MARKET_TIME_ZONE).timestamp()),
+        int(dt.datetime(2026, 3, 9, 9, 30, tzinfo=MARKET_TIME_ZONE).timestamp()),
+        int(dt.datetime(2026, 11, 2, 7, 0, tzinfo=MARKET_TIME_ZONE).timestamp()),
+        int(dt.datetime(2026, 11, 2, 16, 0, tzinfo=MARKET_TIME_ZONE).timestamp()),
+    ]
+    dst_series = ChartSeries.from_rows([(epoch, 1.0, 1.0, 1.0, 1.0, 1.0) for epoch in dst_epochs])
+    calendar = dst_series.calendar()
+    assert calendar.sessions.tolist() == [SESSION_REGULAR, SESSION_REGULAR, SESSION_PRE, SESSION_AFTER]
+    assert calendar.local_date(1) == dt.date(2026, 3, 9) and calendar.local_seconds[2] == 7 * 3600
+    assert dst_series[1:].calendar().local_days.tolist() == calendar.local_days[1:].tolist()
+    half_day = int(dt.datetime(2026, 11, 27, 13, 30, tzinfo=MARKET_TIME_ZONE).timestamp())
+    assert _stock_extended_session_key(half_day) == ("after", dt.date(2026, 11, 27))
     live_quote_rows = {
         "date": [et_epoch(7, 5), et_epoch(7, 7) + 15],
         "open": [10, 12],
@@ -292,7 +337,7 @@ def test_charting_regressions() -> None:
     assert _visible_indexes(
         [today_rows[0], *dense_today_rows],
         ChartRequest("AMD", "i5", "5 min"),
-    ) == list(range(1, SPARSE_CHART_MIN_BARS + 1))
+    ) == range(1, SPARSE_CHART_MIN_BARS + 1)
     wick_rows = [
         (et_epoch(7, 0), 100.0, 101.0, 80.0, 100.5, 1.0),
         (et_epoch(9, 30), 100.5, 100.8, 100.2, 100.6, 1.0),
@@ -407,6 +452,16 @@ def test_charting_regressions() -> None:
     assert stock_aggregated["low"] == [9.0, 12.0]
     assert stock_aggregated["close"] == [12.5, 13.5]
     assert stock_aggregated["volume"] == [6.0, 4.0]
+    gapped = aggregate_yahoo_chart_data({
+        "date": [0, 60, 600, 660, 720],
+        "open": [1, 2, 3, 4, 5],
+        "high": [1, 9, 3, 4, 8],
+        "low": [1, 2, 3, 0.5, 5],
+        "close": [1, 2, 3, 4, 5],
+        "volume": [1, 1, 1, 1, 1],
+    }, ChartRequest("AMD", "i10", "10 min"))
+    assert gapped["date"] == [0, 600] and gapped["high"] == [9.0, 8.0] and gapped["low"] == [1.0, 0.5]
+    assert gapped["close"] == [2.0, 5.0] and gapped["volume"] == [2.0, 3.0]
     assert parse_chart_command(";fut 6e") == ChartRequest("6E", "i5", "5 min", futures=True)
     sample_png = render_price_chart_png({
         "ticker": "ES",
@@ -445,6 +500,30 @@ def test_charting_regressions() -> None:
     }, ChartRequest("SMA", "d", "daily"))
     from PIL import Image
     smooth_image = Image.open(io.BytesIO(smooth_png)).convert("RGB")
+    dense_close = [50.0 + math.sin(i / 9) * 8.0 + (i % 7) * 0.3 for i in range(1500)]
+    dense_quote = {
+        "ticker": "DENSE",
+        "date": [1_500_000_000 + i * 86400 for i in range(len(dense_close))],
+        "open": [value - 0.5 + (i % 3) * 0.4 for i, value in enumerate(dense_close)],
+        "high": [value + 1.2 for value in dense_close],
+        "low": [value - 1.2 for value in dense_close],
+        "close": dense_close,
+        "volume": [(i * 7919) % 5000 for i in range(len(dense_close))],
+    }
+    for raster_request in (
+        ChartRequest("DENSE", "d", "daily", date_range="max", date_range_label="max"),
+        ChartRequest("DENSE", "d", "daily", "l", "line", "dark", "dark"),
+        ChartRequest("DENSE", "d", "daily", theme="dark", theme_label="dark", scale="logarithmic", scale_label="log"),
+    ):
+        drawn, painted = (
+            Image.open(io.BytesIO(render_price_chart_png(dense_quote, raster_request, raster=raster))).convert("RGB")
+            for raster in ("draw", "array")
+        )
+        assert drawn.tobytes() == painted.tobytes()
+    for encoding, magic in (("fast", b"\x89PNG"), ("compact", b"\x89PNG"), ("webp", b"RIFF")):
+        assert encode_chart_image(smooth_image, encoding).startswith(magic)
+    compact_image = Image.open(io.BytesIO(encode_chart_image(smooth_image, "compact")))
+    assert compact_image.mode == "P" and compact_image.convert("RGB").getpixel((5, 5)) == smooth_image.getpixel((5, 5))
     crop = smooth_image.crop((60, 34, DEFAULT_WIDTH * DEFAULT_SCALE_FACTOR - CHART_RIGHT_MARGIN, 370))
     crop_bytes = crop.tobytes()
     edge_pixels = 0
@@ -480,6 +559,26 @@ def test_charting_regressions() -> None:
     assert sma200_volume_pixels > 50
     aapl_req = parse_chart_command(";aapl")
     assert aapl_req is not None and not aapl_req.futures and aapl_req.timeframe == "i5"
+    # `d` (2y fetch) and `d 5y` (10y fetch) keep separate indicator state, so alternating reuses both.
+    long_close = [50.0 + math.sin(i / 9) for i in range(2600)]
+    long_quote = {
+        "ticker": "ALT",
+        "date": [1_500_000_000 + i * 86400 for i in range(len(long_close))],
+        "open": long_close,
+        "high": [value + 1.0 for value in long_close],
+        "low": [value - 1.0 for value in long_close],
+        "close": long_close,
+        "volume": [100.0] * len(long_close),
+    }
+    short_quote = {**long_quote, **{field: long_quote[field][-500:] for field in ("date", "open", "high", "low", "close", "volume")}}
+    two_year = ChartRequest("ALT", "d", "daily")
+    ten_year = ChartRequest("ALT", "d", "daily", date_range="y5", date_range_label="5 years")
+    render_price_chart_png(short_quote, two_year)
+    render_price_chart_png(long_quote, ten_year)
+    computed = indicator_engine.computed_bars
+    render_price_chart_png(short_quote, two_year)
+    render_price_chart_png(long_quote, ten_year)
+    assert indicator_engine.computed_bars == computed
 
 
 if __name__ == "__main__":
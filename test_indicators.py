@@ -0,0 +1,66 @@
+import math
+
+import numpy as np
+
+from charting import ChartSeries, _sma_values
+from indicators import IndicatorEngine
+
+
+def test_indicators_regressions() -> None:
+    """Run lightweight assert-based regression checks."""
+    def series(closes: list[float], start: int = 0) -> ChartSeries:
+        return ChartSeries.from_rows([
+            (60 * (start + i), close, close + 1.0, close - 1.0, close, 10.0) for i, close in enumerate(closes)
+        ])
+
+    closes = [100.0 + ((i * 37) % 17) * 0.1 for i in range(400)]
+    engine = IndicatorEngine(max_bars=700)
+    first = series(closes)
+    assert engine.sma("AMD", first, 20) == _sma_values(first, 20)
+    assert engine.computed_bars == 400
+    grown = series(closes + [101.3, 102.7])
+    assert engine.sma("AMD", grown, 20) == _sma_values(grown, 20)
+    assert engine.computed_bars == 402 and engine.reused_bars == 400
+    revised = series(closes + [101.3, 99.9])
+    assert engine.sma("AMD", revised, 20) == _sma_values(revised, 20)
+    assert engine.computed_bars == 403
+    shifted = series(closes[1:] + [101.3, 99.9], start=1)
+    assert engine.sma("AMD", shifted, 20) == _sma_values(shifted, 20)
+    before = engine.sma("AMD", shifted, 200)
+    engine.sma("AMD", series(closes[:50]), 200)
+    assert before == _sma_values(shifted, 200)
+
+    history = series([100.0 + ((i * 53) % 29) * 0.37 for i in range(3000)])
+    for first in (0, 10, 199, 200, 2800, 3000):
+        windowed = IndicatorEngine().sma("MAX", history, 200, first)
+        full = _sma_values(history, 200)
+        assert windowed[:first] == [None] * first
+        assert all(
+            (got is None and want is None) or (got is not None and want is not None and math.isclose(got, want, rel_tol=1e-12))
+            for got, want in zip(windowed[first:], full[first:], strict=True)
+        )
+    assert IndicatorEngine().sma("MAX", history, 200, 150) == [None] * 150 + full[150:]
+    assert engine.sma("AMD", grown, 20, 300)[:300] == [None] * 300
+    assert engine.sma("AMD", grown, 20) == _sma_values(grown, 20)
+
+    ema = engine.ema("EMA", series([1.0, 2.0, 3.0, 4.0]), 3)
+    assert ema == [None, None, 2.0, 3.0]
+    days = np.array([0, 0, 1])
+    vwap = engine.vwap("VWAP", ChartSeries.from_rows([
+        (0, 1.0, 3.0, 0.0, 3.0, 1.0),
+        (60, 1.0, 6.0, 3.0, 3.0, 3.0),
+        (120, 1.0, 5.0, 5.0, 5.0, 2.0),
+    ]), days)
+    assert vwap == [2.0, 3.5, 5.0]
+    # The three series hold 459 bars; 300 more overflow the budget and evict AMD, the oldest.
+    assert len(engine) == 3
+    engine.sma("BIG", series(closes[:300]), 20)
+    assert len(engine) == 3
+    computed = engine.computed_bars
+    engine.sma("AMD", grown, 20)
+    assert engine.computed_bars == computed + 402
+
+
+if __name__ == "__main__":
+    test_indicators_regressions()
+    print("test_indicators ok")
@@ -0,0 +1,222 @@
+import asyncio
+import datetime as dt
+import json
+import math
+
+from charting import MARKET_TIME_ZONE, ChartRequest, yahoo_chart_url
+from market_cache import (
+    CHART_CACHE_TTL_SECONDS,
+    ByteLRUCache,
+    DailyBarStore,
+    IntradaySeriesStore,
+    SingleFlight,
+    TTLCache,
+    chart_cache_key,
+    chart_cache_ttl,
+    chart_image_key,
+    chart_tail_url,
+    chart_window_start,
+    daily_session_closes,
+    decode_chart_json,
+    derive_cached_chart,
+    derive_chart_data,
+    derived_chart_sources,
+    merge_chart_tail,
+    previous_session_close,
+)
+
+
+def test_market_cache_regressions() -> None:
+    """Run lightweight assert-based regression checks."""
+    now = [1000.0]
+    cache = TTLCache(2, clock=lambda: now[0])
+    assert cache.get("spy") is None
+    cache.set("spy", {"chart": 1}, 15)
+    assert cache.get("spy") == {"chart": 1}
+    now[0] += 15
+    assert cache.get("spy") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    cache.set("c", 3, 60)
+    assert len(cache) == 2 and cache.get("a") is None and cache.get("c") == 3
+    cache.set("zero", 1, 0)
+    assert cache.get("zero") is None
+
+    intraday_url = yahoo_chart_url(ChartRequest("AMD", "i1", "1 min"))
+    daily_url = yahoo_chart_url(ChartRequest("AMD", "d", "daily"))
+    assert chart_cache_ttl(intraday_url) == CHART_CACHE_TTL_SECONDS["1m"]
+    assert chart_cache_ttl(yahoo_chart_url(ChartRequest("AMD", "h", "hourly"))) == CHART_CACHE_TTL_SECONDS["60m"]
+    assert chart_cache_ttl(daily_url) == CHART_CACHE_TTL_SECONDS["1d"]
+    assert chart_cache_ttl(intraday_url) < chart_cache_ttl(daily_url) < chart_cache_ttl(
+        yahoo_chart_url(ChartRequest("AMD", "m", "monthly"))
+    )
+    assert chart_cache_key(intraday_url) == chart_cache_key(yahoo_chart_url(ChartRequest("AMD", "i3", "3 min")))
+    assert chart_cache_key(intraday_url) != chart_cache_key(intraday_url.replace("range=5d", "range=1d"))
+    assert chart_cache_key(daily_url) != chart_cache_key(yahoo_chart_url(ChartRequest("AMD", "d", "daily", date_range="y5")))
+    saturday = dt.datetime(2026, 6, 13, 12, tzinfo=MARKET_TIME_ZONE).timestamp()
+    monday_open = dt.datetime(2026, 6, 15, 4, tzinfo=MARKET_TIME_ZONE).timestamp()
+    equity = {"chart": {"result": [{"meta": {"instrumentType": "EQUITY"}}], "error": None}}
+    crypto = {"chart": {"result": [{"meta": {"instrumentType": "CRYPTOCURRENCY"}}], "error": None}}
+    assert chart_cache_ttl(intraday_url, equity, now=saturday) == monday_open - saturday
+    assert chart_cache_ttl(intraday_url, crypto, now=saturday) == CHART_CACHE_TTL_SECONDS["1m"]
+    assert chart_cache_ttl(intraday_url, equity, now=monday_open + 3600) == CHART_CACHE_TTL_SECONDS["1m"]
+    monthly_key = chart_cache_key(yahoo_chart_url(ChartRequest("AMD", "m", "monthly")))
+    assert monthly_key == chart_cache_key(yahoo_chart_url(ChartRequest("AMD", "m", "monthly")).replace("period2=", "period2=9"))
+
+    flights = SingleFlight()
+    calls: list[str] = []
+
+    async def fetch(key: str) -> str:
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        if key == "bad":
+            raise ValueError("upstream failed")
+        return key.upper()
+
+    async def burst() -> list[object]:
+        return await asyncio.gather(
+            *(flights.run(request, lambda: fetch("spy")) for request in [ChartRequest("SPY")] * 5),
+            *(flights.run("bad", lambda: fetch("bad")) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(burst())
+    assert results[:5] == ["SPY"] * 5
+    assert all(isinstance(result, ValueError) for result in results[5:])
+    assert sorted(calls) == ["bad", "spy"] and flights.shared == 6 and len(flights) == 0
+
+    images = ByteLRUCache(10)
+    images.set("a", b"aaaa")
+    images.set("b", b"bbbb")
+    assert images.get("a") == b"aaaa"
+    images.set("c", b"cccc")
+    assert images.get("b") is None and images.get("a") == b"aaaa" and images.size == 8
+    images.set("huge", b"x" * 11)
+    assert images.get("huge") is None and len(images) == 2
+    quote = {"date": [1, 2], "close": [10.0, 11.0], "lastClose": 11.0, "prevClose": 10.0}
+    spy = ChartRequest("SPY")
+    assert chart_image_key(quote, spy) == chart_image_key(dict(quote), ChartRequest("SPY"))
+    assert chart_image_key(quote, spy) != chart_image_key({**quote, "date": [1, 3]}, spy)
+    assert chart_image_key(quote, spy) != chart_image_key({**quote, "lastClose": 11.5}, spy)
+    assert chart_image_key(quote, spy) != chart_image_key(quote, ChartRequest("SPY", theme="dark"))
+
+    def et_epoch(day: int, hour: int, minute: int = 0) -> float:
+        return dt.datetime(2026, 6, day, hour, minute, tzinfo=MARKET_TIME_ZONE).timestamp()
+
+    # Daily stock bars are stamped at the 9:30 open; Fri 6/12, Mon 6/15 and Tue 6/16.
+    daily_dates = [et_epoch(day, 9, 30) for day in (12, 15, 16)]
+    sessions = daily_session_closes(daily_dates, [100.0, 101.5, None], False)
+    assert sessions == [(dt.date(2026, 6, 12), 100.0), (dt.date(2026, 6, 15), 101.5)]
+    # Before Tuesday's open the payload has no Tuesday bar; the previous close is still Monday's.
+    assert previous_session_close(sessions[:2], et_epoch(16, 8), False) == 101.5
+    assert previous_session_close(sessions, et_epoch(16, 10), False) == 101.5
+    assert previous_session_close(sessions, et_epoch(16, 3), False) == 100.0
+    assert previous_session_close(sessions[:1], et_epoch(16, 10), False) is None
+    assert previous_session_close(sessions, et_epoch(20, 12), False) is None
+    store = DailyBarStore(max_symbols=2)
+    assert store.previous_close("AMD", et_epoch(16, 10), False) is None
+    store.put("AMD", daily_dates, [100.0, 101.5, 103.0], False)
+    assert store.previous_close("AMD", et_epoch(16, 10), False) == 101.5
+    assert store.previous_close("AMD", et_epoch(17, 10), False) == 103.0
+    assert store.previous_close("AMD", et_epoch(18, 10), False) is None
+    store.put("NEW", daily_dates[-1:], [1.0], False)
+    assert store.previous_close("NEW", et_epoch(16, 10), False) is None
+    # Globex bars for a trade date may be stamped at the 18:00 ET open the evening before.
+    store.put("ES=F", [et_epoch(14, 18), et_epoch(15, 18)], [5000.0, 5010.0], True)
+    assert store.previous_close("ES=F", et_epoch(16, 10), True) == 5000.0
+    assert len(store) == 2 and store.previous_close("AMD", et_epoch(16, 10), False) is None
+    assert (store.hits, store.misses) == (3, 4)
+
+    def chart(dates: list[int], closes: list[float | None], **meta: float) -> dict[str, object]:
+        quote = {field: list(closes) for field in ("open", "high", "low", "close")}
+        quote["volume"] = [100] * len(dates)
+        return {"chart": {"result": [{"meta": meta, "timestamp": dates, "indicators": {"quote": [quote]}}], "error": None}}
+
+    payload = chart([0, 60, 120], [1.0, None, 3.0], regularMarketPrice=3.0, currentTradingPeriod=1.0)
+    payload["chart"]["result"][0]["events"] = {"dividends": {}}
+    payload["chart"]["result"][0]["indicators"]["quote"][0]["volume"] = [1, "bad", 3]
+    decoded = decode_chart_json(json.dumps(payload).encode(), loads=json.loads)
+    decoded_result = decoded["chart"]["result"][0]
+    assert decoded_result["meta"] == {"regularMarketPrice": 3.0} and "events" not in decoded_result
+    assert decoded_result["timestamp"].typecode == "q" and list(decoded_result["timestamp"]) == [0, 60, 120]
+    decoded_close = decoded_result["indicators"]["quote"][0]["close"]
+    assert decoded_close[0] == 1.0 and math.isnan(decoded_close[1]) and decoded_close[2] == 3.0
+    assert decoded_result["indicators"]["quote"][0]["volume"] == [1, "bad", 3]
+    assert decode_chart_json(b'{"chart": {"result": null, "error": {"code": "Not Found"}}}') == {
+        "chart": {"result": None, "error": {"code": "Not Found"}},
+    }
+    five_minute_url = yahoo_chart_url(ChartRequest("AMD", "i5", "5 min"))
+    base = chart([0, 300, 600, 900, 1000], [1.0, 2.0, 3.0, 4.0, 4.5], chartPreviousClose=0.5, regularMarketPrice=4.5)
+    tail_url = chart_tail_url(five_minute_url, base, 1200)
+    assert tail_url is not None and "range=" not in tail_url
+    assert "period1=600" in tail_url and "period2=1200" in tail_url and "includePrePost=true" in tail_url
+    assert chart_tail_url(yahoo_chart_url(ChartRequest("AMD", "d", "daily")), base, 1200) is None
+    assert chart_tail_url(five_minute_url, {"chart": {"result": None}}, 1200) is None
+    assert chart_tail_url(five_minute_url.replace("range=5d", "range=1d"), base, 1200) is None
+    monday = dt.datetime(2026, 6, 22, 10, 0, tzinfo=MARKET_TIME_ZONE).timestamp()
+    # Juneteenth (Fri 6/19) is an NYSE holiday but a Globex session, so 5d reaches back further for stocks.
+    assert chart_window_start("5d", monday, False) == dt.datetime(2026, 6, 15, tzinfo=MARKET_TIME_ZONE).timestamp()
+    assert chart_window_start("5d", monday, True) == dt.datetime(2026, 6, 15, 18, tzinfo=MARKET_TIME_ZONE).timestamp()
+    assert chart_window_start("1mo", monday, False) == dt.datetime(2026, 5, 22, tzinfo=MARKET_TIME_ZONE).timestamp()
+    assert chart_window_start("1d", monday, False) is None and chart_window_start("max", monday, False) is None
+    tail = chart([600, 900, 1200], [3.1, 4.2, 5.0], chartPreviousClose=2.0, regularMarketPrice=5.0)
+    merged = merge_chart_tail(base, tail)
+    assert merged is not None
+    merged_result = merged["chart"]["result"][0]
+    assert merged_result["timestamp"] == [0, 300, 600, 900, 1200]
+    assert merged_result["indicators"]["quote"][0]["close"] == [1.0, 2.0, 3.1, 4.2, 5.0]
+    assert merged_result["meta"] == {"chartPreviousClose": 0.5, "regularMarketPrice": 5.0}
+    assert merge_chart_tail(base, {"chart": {"error": {"code": "Not Found"}}}) is None
+    unchanged = merge_chart_tail(base, chart([], [], regularMarketPrice=4.6))
+    assert unchanged is not None and unchanged["chart"]["result"][0]["timestamp"] == [0, 300, 600, 900, 1000]
+    now[0] = 0.0
+    series = IntradaySeriesStore(max_entries=2, max_age=60, clock=lambda: now[0])
+    series.put("amd", base)
+    now[0] = 50.0
+    series.put("amd", merged, tail=True)
+    assert series.get("amd") is merged
+    now[0] = 60.0
+    assert series.get("amd") is None
+    assert (series.tail_refreshes, series.full_refreshes) == (1, 1)
+
+    one_minute_key = chart_cache_key(yahoo_chart_url(ChartRequest("AMD", "i1", "1 min")))
+    fifteen_key = chart_cache_key(yahoo_chart_url(ChartRequest("AMD", "i15", "15 min")))
+    assert one_minute_key in derived_chart_sources(fifteen_key)
+    thirty_sources = derived_chart_sources(chart_cache_key(yahoo_chart_url(ChartRequest("AMD", "i30", "30 min"))))
+    assert thirty_sources == []
+    daily_key = chart_cache_key(yahoo_chart_url(ChartRequest("AMD", "d", "daily")))
+    weekly_key = chart_cache_key(yahoo_chart_url(ChartRequest("AMD", "w", "weekly")))
+    monthly_key = chart_cache_key(yahoo_chart_url(ChartRequest("AMD", "m", "monthly")))
+    assert daily_key not in derived_chart_sources(weekly_key)
+    assert chart_cache_key(yahoo_chart_url(ChartRequest("AMD", "d", "daily", date_range="y5"))) in derived_chart_sources(weekly_key)
+    assert [source[2] for source in derived_chart_sources(monthly_key)] == ["max"]
+    minutes = chart([60 * i for i in range(6)], [1.0, 2.0, None, 4.0, 5.0, 6.0])
+    minutes["chart"]["result"][0]["indicators"]["quote"][0]["high"] = [1.5, 2.5, None, 4.5, 5.5, 6.5]
+    five = derive_chart_data(minutes, "5m")
+    assert five is not None
+    five_result = five["chart"]["result"][0]
+    assert five_result["timestamp"] == [0, 300]
+    assert five_result["indicators"]["quote"][0] == {
+        "open": [1.0, 6.0], "high": [5.5, 6.5], "low": [1.0, 6.0], "close": [5.0, 6.0], "volume": [400.0, 100.0],
+    }
+    days = [int(dt.datetime(2026, 1, day, 14, 30, tzinfo=dt.timezone.utc).timestamp()) for day in (29, 30)]
+    days += [int(dt.datetime(2026, 2, day, 14, 30, tzinfo=dt.timezone.utc).timestamp()) for day in (2, 3)]
+    months = derive_chart_data(chart(days, [1.0, 2.0, 3.0, 4.0]), "1mo")
+    weeks = derive_chart_data(chart(days, [1.0, 2.0, 3.0, 4.0]), "1wk")
+    assert months is not None and months["chart"]["result"][0]["timestamp"] == [days[0], days[2]]
+    assert weeks is not None and weeks["chart"]["result"][0]["indicators"]["quote"][0]["close"] == [2.0, 4.0]
+    now[0] = 0.0
+    responses = TTLCache(8, clock=lambda: now[0])
+    assert derive_cached_chart(responses, fifteen_key) is None
+    responses.set(one_minute_key, minutes, 15)
+    now[0] = 5.0
+    five_key = chart_cache_key(yahoo_chart_url(ChartRequest("AMD", "i5", "5 min")))
+    derived = derive_cached_chart(responses, five_key)
+    assert derived == five and (responses.hits, responses.misses) == (0, 0)
+    assert responses.peek(five_key) is derived and responses.ttl(five_key) == 10.0
+
+
+if __name__ == "__main__":
+    test_market_cache_regressions()
+    print("test_market_cache ok")
@@ -0,0 +1,73 @@
+import datetime as dt
+
+from market_calendar import (
+    MARKET_CLOSE_SETTLE_SECONDS,
+    MARKET_TIME_ZONE,
+    is_nyse_trading_day,
+    is_trading_session,
+    latest_trading_session,
+    market_is_open,
+    market_reopens_at,
+    nyse_early_closes,
+    nyse_holidays,
+    previous_trading_session,
+    trading_session_date,
+    trading_session_start,
+)
+
+
+def test_market_calendar_regressions() -> None:
+    """Run lightweight assert-based regression checks."""
+    def et_epoch(year: int, month: int, day: int, hour: int, minute: int = 0) -> float:
+        return dt.datetime(year, month, day, hour, minute, tzinfo=MARKET_TIME_ZONE).timestamp()
+
+    assert sorted(nyse_holidays(2026)) == [
+        dt.date(2026, 1, 1),
+        dt.date(2026, 1, 19),
+        dt.date(2026, 2, 16),
+        dt.date(2026, 4, 3),
+        dt.date(2026, 5, 25),
+        dt.date(2026, 6, 19),
+        dt.date(2026, 7, 3),
+        dt.date(2026, 9, 7),
+        dt.date(2026, 11, 26),
+        dt.date(2026, 12, 25),
+    ]
+    assert dt.date(2021, 12, 31) not in nyse_holidays(2021) and dt.date(2021, 12, 31) not in nyse_holidays(2022)
+    assert dt.date(2027, 12, 24) in nyse_holidays(2027) and dt.date(2027, 6, 18) in nyse_holidays(2027)
+    assert dt.date(2021, 6, 18) not in nyse_holidays(2021)
+    assert sorted(nyse_early_closes(2025)) == [dt.date(2025, 7, 3), dt.date(2025, 11, 28), dt.date(2025, 12, 24)]
+    assert sorted(nyse_early_closes(2026)) == [dt.date(2026, 11, 27), dt.date(2026, 12, 24)]
+    assert is_nyse_trading_day(dt.date(2026, 6, 15)) and not is_nyse_trading_day(dt.date(2026, 6, 13))
+
+    assert market_is_open(et_epoch(2026, 6, 15, 4), False) and market_is_open(et_epoch(2026, 6, 15, 20), False)
+    assert not market_is_open(et_epoch(2026, 6, 15, 3, 59), False)
+    assert not market_is_open(et_epoch(2026, 11, 27, 17, 30), False)
+    assert market_reopens_at(et_epoch(2026, 6, 15, 20, 5), False) is None
+    assert market_reopens_at(et_epoch(2026, 6, 19, 20) + MARKET_CLOSE_SETTLE_SECONDS + 1, False) == et_epoch(2026, 6, 22, 4)
+    assert market_reopens_at(et_epoch(2026, 11, 25, 22), False) == et_epoch(2026, 11, 27, 4)
+    assert market_reopens_at(et_epoch(2026, 6, 16, 2), False) == et_epoch(2026, 6, 16, 4)
+
+    assert market_is_open(et_epoch(2026, 6, 14, 18), True) and market_is_open(et_epoch(2026, 6, 19, 16, 59), True)
+    assert market_reopens_at(et_epoch(2026, 6, 16, 17, 30), True) == et_epoch(2026, 6, 16, 18)
+    assert market_reopens_at(et_epoch(2026, 6, 16, 17, 5), True) is None
+    assert market_reopens_at(et_epoch(2026, 6, 20, 12), True) == et_epoch(2026, 6, 21, 18)
+    assert market_reopens_at(et_epoch(2025, 12, 24, 20), True) == et_epoch(2025, 12, 25, 18)
+    assert market_reopens_at(et_epoch(2026, 12, 25, 12), True) == et_epoch(2026, 12, 27, 18)
+    assert trading_session_date(et_epoch(2026, 6, 18, 17, 30), True) == dt.date(2026, 6, 18)
+    assert trading_session_date(et_epoch(2026, 6, 18, 18), True) == dt.date(2026, 6, 19)
+    assert trading_session_date(et_epoch(2026, 6, 18, 19), False) == dt.date(2026, 6, 18)
+    assert is_trading_session(dt.date(2026, 6, 19), True) and not is_trading_session(dt.date(2026, 6, 19), False)
+    assert trading_session_start(dt.date(2026, 6, 19), True) == et_epoch(2026, 6, 18, 18)
+    assert trading_session_start(dt.date(2026, 6, 19), False) == et_epoch(2026, 6, 19, 0)
+    assert latest_trading_session(et_epoch(2026, 6, 20, 12), False) == dt.date(2026, 6, 18)
+    assert latest_trading_session(et_epoch(2026, 6, 22, 3), False) == dt.date(2026, 6, 18)
+    assert latest_trading_session(et_epoch(2026, 6, 22, 4), False) == dt.date(2026, 6, 22)
+    assert latest_trading_session(et_epoch(2026, 6, 21, 18), True) == dt.date(2026, 6, 22)
+    assert previous_trading_session(dt.date(2026, 6, 22), False) == dt.date(2026, 6, 18)
+    assert previous_trading_session(dt.date(2026, 6, 22), True) == dt.date(2026, 6, 19)
+
+
+if __name__ == "__main__":
+    test_market_calendar_regressions()
+    print("test_market_calendar ok")